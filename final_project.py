@@ -10,31 +10,28 @@ Original file is located at
 # Apple Stock Price Prediction using RNN and LSTM
 
 # ================== Import Libraries ==================
-import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 from sklearn.preprocessing import MinMaxScaler
-from sklearn.metrics import mean_squared_error
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Dense, SimpleRNN, LSTM, Dropout
+from stock_prediction.windows import MultiHorizonWindows
+from stock_prediction.data import load_features
+from stock_prediction.models import (build_simplernn, build_lstm, fit_multi_horizon,
+                                     multi_horizon_results)
+from stock_prediction.reporting import ReportRenderer, is_headless
 from tensorflow.keras.callbacks import EarlyStopping
 
-# ================== 1. Data Cleaning (20%) ==================
-# Load dataset
-data = pd.read_csv('/content/AAPL.csv')
-
-# Convert 'Date' to datetime and set as index
-data['Date'] = pd.to_datetime(data['Date'])
-data.set_index('Date', inplace=True)
-
-# Check and display missing values
-print("Missing values before cleaning:\n", data.isnull().sum())
+# With a non-interactive matplotlib backend (e.g. Agg on a server) the figures
+# are rendered to reports/ in background workers instead of plt.show()
+report = ReportRenderer('reports') if is_headless() else None
 
-# Drop rows with any missing values
-data.dropna(inplace=True)
+# ================== 1. Data Cleaning (20%) ==================
+# Load dataset indexed by 'Date', dropping rows with any missing values.
+# The cleaned frame is cached, so reruns skip parsing the CSV
+data = load_features('/content/AAPL.csv', features=[],
+                     columns=('Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume'))
 
 # Confirm no missing values
-print("\nMissing values after cleaning:\n", data.isnull().sum())
+print("Missing values after cleaning:\n", data.isnull().sum())
 
 # ================== 2. Data Preprocessing (20%) ==================
 # Use only the 'Adj Close' column
@@ -44,102 +41,70 @@ data = data[['Adj Close']]
 scaler = MinMaxScaler()
 data_scaled = scaler.fit_transform(data)
 
-# Create time-series sequences
-def create_sequences(data, window_size, future_day):
-    X, y = [], []
-    for i in range(len(data) - window_size - future_day + 1):
-        X.append(data[i:i+window_size])
-        y.append(data[i+window_size+future_day-1])
-    return np.array(X), np.array(y)
-
 # Set parameters
 window_size = 60
 future_days = [1, 5, 10]  # Predict 1-day, 5-day, and 10-day ahead
 
-# Split into training and testing sets
+# Split into training and testing sets at train_size
 train_size = int(len(data_scaled) * 0.8)
-train_data = data_scaled[:train_size]
-test_data = data_scaled[train_size - window_size:]
+
+# Build the input windows once and share them across all horizons
+windows = MultiHorizonWindows(data_scaled, window_size, future_days)
 
 # ================== 3. Data Visualization (10%) ==================
-plt.figure(figsize=(10, 4))
-plt.plot(data.index, data['Adj Close'], color='blue', label='Adj Close Price')
-plt.title('Apple Stock - Adjusted Close Price')
-plt.xlabel('Date')
-plt.ylabel('Price')
-plt.grid(True)
-plt.legend()
-plt.tight_layout()
-plt.show()
+if report is not None:
+    report.predictions('adj_close.png', data['Adj Close'], {},
+                       'Apple Stock - Adjusted Close Price', xlabel='Trading Day')
+else:
+    plt.figure(figsize=(10, 4))
+    plt.plot(data.index, data['Adj Close'], color='blue', label='Adj Close Price')
+    plt.title('Apple Stock - Adjusted Close Price')
+    plt.xlabel('Date')
+    plt.ylabel('Price')
+    plt.grid(True)
+    plt.legend()
+    plt.tight_layout()
+    plt.show()
 
 # ================== 4. Feature Engineering (10%) ==================
 # Feature: use 60-day window to predict future stock prices (1, 5, 10 days)
-# Already implemented in create_sequences function
+# Already implemented by MultiHorizonWindows
 
 # ================== 5. Deep Learning Modeling (30%) ==================
-results = {}
+# One SimpleRNN and one LSTM, each with a shared encoder and one output head
+# per horizon, so every horizon is learned in a single fit per model
+fit_kwargs = dict(epochs=20, batch_size=32, validation_split=0.1, verbose=0,
+                  callbacks=[EarlyStopping(patience=5, restore_best_weights=True)])
 
-for future_day in future_days:
-    print(f"\n=== Predicting {future_day}-day ahead prices ===")
-
-    # Create sequences
-    X_train, y_train = create_sequences(train_data, window_size, future_day)
-    X_test, y_test = create_sequences(test_data, window_size, future_day)
+# ------------------- Simple RNN -------------------
+rnn_model = build_simplernn(window_size, units=50, dropout_rate=0.2, horizons=future_days)
+fit_multi_horizon(rnn_model, windows, train_size, **fit_kwargs)
 
-    # Reshape inputs for RNN/LSTM
-    X_train_rnn = X_train.reshape((X_train.shape[0], X_train.shape[1], 1))
-    X_test_rnn = X_test.reshape((X_test.shape[0], X_test.shape[1], 1))
+# ------------------- LSTM -------------------
+lstm_model = build_lstm(window_size, units=50, dropout_rate=0.2, horizons=future_days)
+fit_multi_horizon(lstm_model, windows, train_size, **fit_kwargs)
 
-    # ------------------- Simple RNN -------------------
-    rnn_model = Sequential([
-        SimpleRNN(50, activation='tanh', input_shape=(window_size, 1)),
-        Dropout(0.2),
-        Dense(1)
-    ])
-    rnn_model.compile(optimizer='adam', loss='mse')
+# Per horizon: RNN_MSE, LSTM_MSE, y_test, RNN_pred, LSTM_pred (prices)
+results = multi_horizon_results({'RNN': rnn_model, 'LSTM': lstm_model}, windows,
+                                train_size, inverse_transform=scaler.inverse_transform)
 
-    rnn_model.fit(X_train_rnn, y_train, epochs=20, batch_size=32,
-                  validation_split=0.1, callbacks=[EarlyStopping(patience=5, restore_best_weights=True)],
-                  verbose=0)
-
-    rnn_pred = rnn_model.predict(X_test_rnn)
-    rnn_pred_rescaled = scaler.inverse_transform(rnn_pred)
-    y_test_rescaled = scaler.inverse_transform(y_test.reshape(-1, 1))
-
-    rnn_mse = mean_squared_error(y_test_rescaled, rnn_pred_rescaled)
-
-    # ------------------- LSTM -------------------
-    lstm_model = Sequential([
-        LSTM(50, return_sequences=False, input_shape=(window_size, 1)),
-        Dropout(0.2),
-        Dense(1)
-    ])
-    lstm_model.compile(optimizer='adam', loss='mse')
-
-    lstm_model.fit(X_train_rnn, y_train, epochs=20, batch_size=32,
-                   validation_split=0.1, callbacks=[EarlyStopping(patience=5, restore_best_weights=True)],
-                   verbose=0)
-
-    lstm_pred = lstm_model.predict(X_test_rnn)
-    lstm_pred_rescaled = scaler.inverse_transform(lstm_pred)
-
-    lstm_mse = mean_squared_error(y_test_rescaled, lstm_pred_rescaled)
-
-    # Store results
-    results[future_day] = {
-        'RNN_MSE': rnn_mse,
-        'LSTM_MSE': lstm_mse,
-        'y_test': y_test_rescaled,
-        'rnn_pred': rnn_pred_rescaled,
-        'lstm_pred': lstm_pred_rescaled
-    }
-
-    # ================== 6. Model Evaluation & Visualization (10%) ==================
+# ================== 6. Model Evaluation & Visualization (10%) ==================
+for future_day in future_days:
+    print(f"\n=== Predicting {future_day}-day ahead prices ===")
+    y_test_rescaled = results[future_day]['y_test']
+    title = f"{future_day}-Day Ahead Prediction: Actual vs Predicted"
+
+    if report is not None:
+        report.predictions(f'rnn_lstm_prediction_{future_day}d.png', y_test_rescaled,
+                           {'SimpleRNN Prediction': results[future_day]['RNN_pred'],
+                            'LSTM Prediction': results[future_day]['LSTM_pred']},
+                           title, ylabel='Stock Price')
+        continue
     plt.figure(figsize=(12, 5))
     plt.plot(y_test_rescaled, label='Actual Price')
-    plt.plot(rnn_pred_rescaled, label='SimpleRNN Prediction')
-    plt.plot(lstm_pred_rescaled, label='LSTM Prediction')
-    plt.title(f"{future_day}-Day Ahead Prediction: Actual vs Predicted")
+    plt.plot(results[future_day]['RNN_pred'], label='SimpleRNN Prediction')
+    plt.plot(results[future_day]['LSTM_pred'], label='LSTM Prediction')
+    plt.title(title)
     plt.xlabel('Time Step')
     plt.ylabel('Stock Price')
     plt.legend()
@@ -147,13 +112,22 @@ for future_day in future_days:
     plt.tight_layout()
     plt.show()
 
+if report is not None:
+    print("Figures written:", *report.close(), sep="\n  ")
+
 # ================== Final Summary ==================
 for future_day, metrics in results.items():
     print(f"\n=== {future_day}-Day Ahead Forecast Summary ===")
     print(f"SimpleRNN MSE: {metrics['RNN_MSE']:.4f}")
     print(f"LSTM MSE    : {metrics['LSTM_MSE']:.4f}")
 
-pip install tensorflow pandas numpy matplotlib scikit-learn
+# Metrics with 95% block-bootstrap intervals; p_better = P(LSTM MSE < SimpleRNN MSE)
+from stock_prediction.evaluation import evaluate_results
+
+evaluation = evaluate_results(results, baseline='RNN')
+print(evaluation[['MSE', 'MSE_lo', 'MSE_hi', 'MAE', 'MAPE', 'DA', 'p_better']].round(4))
+
+# !pip install tensorflow pandas numpy matplotlib scikit-learn
 
 # ================== 1. Imports ==================
 import pandas as pd
@@ -161,95 +135,99 @@ import numpy as np
 import matplotlib.pyplot as plt
 from sklearn.preprocessing import MinMaxScaler
 from sklearn.metrics import mean_squared_error
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Dense, LSTM, Dropout, Bidirectional
+from stock_prediction.windows import MultiHorizonWindows
+from stock_prediction.data import load_features
+from stock_prediction.instrument import RunMetrics, keras_callback
+from stock_prediction.reporting import ReportRenderer, is_headless
+from stock_prediction.models import (build_bilstm, fit_multi_horizon, head_name,
+                                     predict_multi_horizon)
 from tensorflow.keras.callbacks import EarlyStopping
 
+# Stage timings (load, clean, feature, scale, window, fit, ...), per-epoch
+# throughput and MSE go to run_metrics.jsonl
+metrics = RunMetrics('run_metrics.jsonl', section='bidirectional_lstm')
+
 # ================== 2. Load & Feature Engineering ==================
-df = pd.read_csv('/content/AAPL.csv')
-df['Date'] = pd.to_datetime(df['Date'])
-df.set_index('Date', inplace=True)
-
-df = df[['Adj Close']].copy()
-df['MA10'] = df['Adj Close'].rolling(window=10).mean()
-df['MA50'] = df['Adj Close'].rolling(window=50).mean()
-df['Returns'] = df['Adj Close'].pct_change()
-
-def compute_RSI(series, window=14):
-    delta = series.diff()
-    gain = delta.clip(lower=0)
-    loss = -delta.clip(upper=0)
-    avg_gain = gain.rolling(window).mean()
-    avg_loss = loss.rolling(window).mean()
-    rs = avg_gain / avg_loss
-    return 100 - (100 / (1 + rs))
-
-df['RSI'] = compute_RSI(df['Adj Close'])
-df.dropna(inplace=True)
+# 'Adj Close' + MA10, MA50, Returns and RSI (see stock_prediction.features),
+# served from the on-disk cache when the CSV has not changed
+df = load_features('/content/AAPL.csv', features=['MA10', 'MA50', 'Returns', 'RSI'],
+                   metrics=metrics)
 
 # ================== 3. Scale ==================
-scaler = MinMaxScaler()
-scaled_data = scaler.fit_transform(df)
+with metrics.stage('scale'):
+    scaler = MinMaxScaler()
+    scaled_data = scaler.fit_transform(df)
 
 # For inverse scaling only on 'Adj Close'
 adj_scaler = MinMaxScaler()
 adj_scaler.min_, adj_scaler.scale_ = scaler.min_[0], scaler.scale_[0]
 
 # ================== 4. Sequence Generator ==================
-def create_sequences(data, window_size, future_step):
-    X, y = [], []
-    for i in range(len(data) - window_size - future_step + 1):
-        X.append(data[i:i+window_size])
-        y.append(data[i+window_size+future_step-1][0])  # only 'Adj Close'
-    return np.array(X), np.array(y)
+# Input windows shared by the 1, 5 and 10-day models
+window_size = 60
+train_size = int(len(scaled_data) * 0.8)
+with metrics.stage('window'):
+    windows = MultiHorizonWindows(scaled_data, window_size, [1, 5, 10], target_col=0)
 
 # ================== 5. Modeling Function ==================
-def train_predict_model(future_day):
-    print(f"\n🚀 Training {future_day}-Day Prediction Model...")
-    window_size = 60
-    train_size = int(len(scaled_data) * 0.8)
-
-    train_data = scaled_data[:train_size]
-    test_data = scaled_data[train_size - window_size:]
-
-    X_train, y_train = create_sequences(train_data, window_size, future_day)
-    X_test, y_test = create_sequences(test_data, window_size, future_day)
-
-    model = Sequential([
-        Bidirectional(LSTM(64, return_sequences=True), input_shape=(X_train.shape[1], X_train.shape[2])),
-        Dropout(0.3),
-        LSTM(32),
-        Dropout(0.2),
-        Dense(1)
-    ])
-
-    model.compile(optimizer='adam', loss='mse')
+def train_predict_models(steps):
+    """One Bidirectional LSTM with a head per horizon, trained in a single fit."""
+    print(f"\n🚀 Training one model for the {steps}-day horizons...")
+    model = build_bilstm(window_size, scaled_data.shape[1], units=64, horizons=steps)
 
+    n_fit = train_size - window_size - max(steps) + 1
     early_stop = EarlyStopping(monitor='val_loss', patience=5, restore_best_weights=True)
-    history = model.fit(X_train, y_train, epochs=50, batch_size=32,
-                        validation_split=0.1, verbose=0, callbacks=[early_stop])
-
-    pred = model.predict(X_test)
-    pred_rescaled = adj_scaler.inverse_transform(pred)
-    y_test_rescaled = adj_scaler.inverse_transform(y_test.reshape(-1, 1))
-    mse = mean_squared_error(y_test_rescaled, pred_rescaled)
-
-    print(f"✅ {future_day}-Day MSE: {mse:.4f}")
-
-    return y_test_rescaled, pred_rescaled, history
+    epoch_log = keras_callback(metrics, n_fit - int(n_fit * 0.1))
+    with metrics.stage('fit', horizons=list(steps)):
+        history = fit_multi_horizon(model, windows, train_size, epochs=50, batch_size=32,
+                                    validation_split=0.1, verbose=0,
+                                    callbacks=[early_stop, epoch_log])
+
+    with metrics.stage('predict', horizons=list(steps)):
+        forecasts = predict_multi_horizon(model, windows, train_size)
+
+    out = {}
+    for future_day in steps:
+        y_test, pred = forecasts[future_day]
+        with metrics.stage('inverse_transform', horizon=future_day):
+            pred_rescaled = adj_scaler.inverse_transform(pred)
+            y_test_rescaled = adj_scaler.inverse_transform(y_test)
+        with metrics.stage('evaluate', horizon=future_day):
+            mse = mean_squared_error(y_test_rescaled, pred_rescaled)
+
+        metrics.log('result', horizon=future_day, MSE=mse)
+        print(f"✅ {future_day}-Day MSE: {mse:.4f}")
+
+        # this horizon's head loss curves
+        head = head_name(future_day)
+        loss = {'loss': history.history[f'{head}_loss'],
+                'val_loss': history.history[f'val_{head}_loss']}
+        out[future_day] = (y_test_rescaled, pred_rescaled, loss)
+    return out
 
 # ================== 6. Train All Models ==================
+# With a non-interactive matplotlib backend (e.g. Agg on a server) the figures
+# are rendered to reports/ in background workers instead of plt.show()
+report = ReportRenderer('reports') if is_headless() else None
+
 results = {}
+trained = train_predict_models([1, 5, 10])
 for step in [1, 5, 10]:
-    actual, predicted, hist = train_predict_model(step)
+    actual, predicted, hist = trained[step]
     results[step] = {
         'actual': actual,
         'predicted': predicted,
         'history': hist
     }
+    if report is not None:
+        report.predictions(f'bilstm_prediction_{step}d.png', actual,
+                           {f'Predicted Price ({step}-Day Ahead)': predicted},
+                           f'Apple Stock Price Prediction ({step}-Day Ahead)')
+        report.history(f'bilstm_loss_{step}d.png', hist, f'{step}-Day Model Loss')
 
 # ================== 7. Plot Results ==================
-for step in [1, 5, 10]:
+plot_steps = [] if report is not None else [1, 5, 10]  # already rendered when headless
+for step in plot_steps:
     actual = results[step]['actual']
     predicted = results[step]['predicted']
 
@@ -265,12 +243,12 @@ for step in [1, 5, 10]:
     plt.show()
 
 # ================== 8. Plot Training Loss ==================
-for step in [1, 5, 10]:
+for step in plot_steps:
     history = results[step]['history']
 
     plt.figure(figsize=(8, 4))
-    plt.plot(history.history['loss'], label='Train Loss')
-    plt.plot(history.history['val_loss'], label='Val Loss')
+    plt.plot(history['loss'], label='Train Loss')
+    plt.plot(history['val_loss'], label='Val Loss')
     plt.title(f'{step}-Day Model Loss')
     plt.xlabel('Epochs')
     plt.ylabel('Loss')
@@ -279,34 +257,27 @@ for step in [1, 5, 10]:
     plt.tight_layout()
     plt.show()
 
+if report is not None:
+    print("Figures written:", *report.close(), sep="\n  ")
+
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from sklearn.preprocessing import MinMaxScaler
 from sklearn.metrics import mean_squared_error
-from tensorflow.keras.models import Model
-from tensorflow.keras.layers import Input, LSTM, RepeatVector, TimeDistributed, Dense
+from stock_prediction.data import load_features
+from stock_prediction.models import build_seq2seq
+from stock_prediction.seq2seq import Seq2SeqForecaster, seq2seq_results
+from stock_prediction.reporting import ReportRenderer, is_headless
 from tensorflow.keras.callbacks import EarlyStopping
 
 # Load and preprocess data
-data = pd.read_csv('/content/AAPL.csv')
-data['Date'] = pd.to_datetime(data['Date'])
-data.set_index('Date', inplace=True)
-data = data[['Adj Close']]
-data.dropna(inplace=True)
+data = load_features('/content/AAPL.csv', features=[])
 
 # Scale data
 scaler = MinMaxScaler()
 data_scaled = scaler.fit_transform(data)
 
-# Create sequences for Seq2Seq
-def create_seq2seq_data(data, window_size, output_length):
-    X, y = [], []
-    for i in range(len(data) - window_size - output_length + 1):
-        X.append(data[i:i + window_size])
-        y.append(data[i + window_size:i + window_size + output_length])
-    return np.array(X), np.array(y)
-
 # Parameters
 window_size = 60
 forecast_days = [1, 5, 10]
@@ -315,27 +286,22 @@ train_data = data_scaled[:train_size]
 test_data = data_scaled[train_size - window_size:]
 
 results = {}
+report = ReportRenderer('reports') if is_headless() else None
 
-for output_len in forecast_days:
-    print(f"\n📈 Forecasting {output_len}-day ahead using Seq2Seq LSTM...")
-
-    X_train, y_train = create_seq2seq_data(train_data, window_size, output_len)
-    X_test, y_test = create_seq2seq_data(test_data, window_size, output_len)
-
-    # Model
-    inputs = Input(shape=(window_size, 1))
-    encoded = LSTM(100, activation='relu')(inputs)
-    repeated = RepeatVector(output_len)(encoded)
-    decoded = LSTM(100, activation='relu', return_sequences=True)(repeated)
-    output = TimeDistributed(Dense(1))(decoded)
+# One encoder-decoder trained at the longest horizon; step k of its output is
+# the k-day-ahead forecast, so shorter horizons are served by truncation.
+print(f"\n📈 Training one Seq2Seq LSTM for up to {max(forecast_days)} days ahead...")
+forecaster = Seq2SeqForecaster(build_seq2seq(window_size, 1, units=100,
+                                             outputs=max(forecast_days)))
+forecaster.fit(train_data, epochs=20, batch_size=32, validation_split=0.1,
+               callbacks=[EarlyStopping(patience=5, restore_best_weights=True)], verbose=0)
 
-    model = Model(inputs, output)
-    model.compile(optimizer='adam', loss='mse')
-    model.fit(X_train, y_train, epochs=20, batch_size=32, validation_split=0.1,
-              callbacks=[EarlyStopping(patience=5, restore_best_weights=True)], verbose=0)
+# One prediction per test window covers every horizon
+forecasts = seq2seq_results(forecaster, test_data, forecast_days)
 
-    # Predict
-    y_pred = model.predict(X_test)
+for output_len in forecast_days:
+    print(f"\n📈 Forecasting {output_len}-day ahead using Seq2Seq LSTM...")
+    y_test, y_pred = forecasts[output_len]
     y_test_rescaled = scaler.inverse_transform(y_test.reshape(-1, 1))
     y_pred_rescaled = scaler.inverse_transform(y_pred.reshape(-1, 1))
 
@@ -344,6 +310,11 @@ for output_len in forecast_days:
     results[output_len] = mse
 
     # Plot
+    if report is not None:
+        report.predictions(f'seq2seq_prediction_{output_len}d.png', y_test_rescaled[:100],
+                           {'Predicted': y_pred_rescaled[:100]},
+                           f'{output_len}-Day Ahead Seq2Seq Forecast', xlabel='Time Steps')
+        continue
     plt.figure(figsize=(12, 5))
     plt.plot(y_test_rescaled[:100], label='Actual')
     plt.plot(y_pred_rescaled[:100], label='Predicted')
@@ -355,6 +326,9 @@ for output_len in forecast_days:
     plt.tight_layout()
     plt.show()
 
+if report is not None:
+    print("Figures written:", *report.close(), sep="\n  ")
+
 # Final Summary
 print("\n📊 Final Forecast MSE Summary:")
 for day, mse in results.items():
@@ -367,81 +341,59 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from sklearn.preprocessing import MinMaxScaler
 from sklearn.metrics import mean_squared_error
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Dense, SimpleRNN, LSTM, Dropout
+from stock_prediction.windows import MultiHorizonWindows
+from stock_prediction.data import load_features
+from stock_prediction.models import build_simplernn, build_lstm, fit_multi_horizon, head_name
+from stock_prediction.reporting import ReportRenderer, is_headless
 from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint
 
 # 2. Load Dataset
-df = pd.read_csv("AAPL.csv")
-df['Date'] = pd.to_datetime(df['Date'])
-df.set_index('Date', inplace=True)
-df = df[['Adj Close']].dropna()
+df = load_features("AAPL.csv", features=[])
 
 # 3. Scale Data
 scaler = MinMaxScaler()
 scaled_data = scaler.fit_transform(df)
 
 # 4. Create Sequences
-def create_sequences(data, window_size, forecast_days):
-    X, y = [], []
-    for i in range(len(data) - window_size - forecast_days + 1):
-        X.append(data[i:(i + window_size), 0])
-        y.append(data[(i + window_size):(i + window_size + forecast_days), 0])
-    return np.array(X), np.array(y)
+# Built once for every horizon by MultiHorizonWindows below
 
 # 5. Define Parameters
 window_size = 60
 forecast_days_list = [1, 5, 10]
-X_dict, y_dict = {}, {}
 
-for forecast_days in forecast_days_list:
-    X, y = create_sequences(scaled_data, window_size, forecast_days)
-    X_dict[forecast_days] = X.reshape((X.shape[0], X.shape[1], 1))
-    y_dict[forecast_days] = y
+# One set of windows with targets for every day up to the longest horizon
+windows = MultiHorizonWindows(scaled_data, window_size, range(1, max(forecast_days_list) + 1))
+steps = list(windows.horizons)
 
 # 6. Train-Test Split
+# Training rows are those whose 10-day target falls before train_size; the
+# test rows of every horizon start at train_idx
 train_size = int(len(scaled_data) * 0.8)
 train_idx = int((train_size - window_size - max(forecast_days_list)) + 1)
 
 # 7. Model Architectures
-def build_simplernn(units=64, dropout_rate=0.3):
-    model = Sequential([
-        SimpleRNN(units, input_shape=(window_size, 1)),
-        Dropout(dropout_rate),
-        Dense(forecast_days)
-    ])
-    model.compile(optimizer='adam', loss='mse')
-    return model
-
-def build_lstm(units=64, dropout_rate=0.3):
-    model = Sequential([
-        LSTM(units, input_shape=(window_size, 1)),
-        Dropout(dropout_rate),
-        Dense(forecast_days)
-    ])
-    model.compile(optimizer='adam', loss='mse')
-    return model
+# One head per day ahead on a shared encoder: the first n heads together
+# forecast the next n days, so one fit per architecture covers every horizon
+rnn_model = build_simplernn(window_size, horizons=steps)
+lstm_model = build_lstm(window_size, horizons=steps)
 
 # 8. Training and Evaluation
+print(f"\nTraining for the {forecast_days_list}-day forecasts:")
+fit_multi_horizon(rnn_model, windows, train_size, epochs=50, batch_size=32, verbose=0)
+fit_multi_horizon(lstm_model, windows, train_size, epochs=50, batch_size=32, verbose=0)
+rnn_steps = rnn_model.predict(windows.X[train_idx:], verbose=0)
+lstm_steps = lstm_model.predict(windows.X[train_idx:], verbose=0)
+
 results = {}
+report = ReportRenderer('reports') if is_headless() else None
 for forecast_days in forecast_days_list:
-    X = X_dict[forecast_days]
-    y = y_dict[forecast_days]
-    X_train, X_test = X[:train_idx], X[train_idx:]
-    y_train, y_test = y[:train_idx], y[train_idx:]
-
-    print(f"\nTraining for {forecast_days}-day forecast:")
-
-    # SimpleRNN
-    rnn_model = build_simplernn()
-    rnn_model.fit(X_train, y_train, epochs=50, batch_size=32, verbose=0)
-    rnn_pred = rnn_model.predict(X_test)
+    # (n, forecast_days) paths over the test windows with a forecast_days-day target
+    _, y_steps = windows.rows(forecast_days, steps=True)
+    y_test = y_steps[train_idx:]
+    n = len(y_test)
+    rnn_pred = np.hstack([rnn_steps[head_name(d)][:n] for d in range(1, forecast_days + 1)])
+    lstm_pred = np.hstack([lstm_steps[head_name(d)][:n] for d in range(1, forecast_days + 1)])
     rnn_mse = mean_squared_error(y_test, rnn_pred)
-
-    # LSTM
-    lstm_model = build_lstm()
-    lstm_model.fit(X_train, y_train, epochs=50, batch_size=32, verbose=0)
-    lstm_pred = lstm_model.predict(X_test)
     lstm_mse = mean_squared_error(y_test, lstm_pred)
 
     # Save results
@@ -451,14 +403,26 @@ for forecast_days in forecast_days_list:
     }
 
     # Plot predictions
+    actual = scaler.inverse_transform(y_test.reshape(-1, 1))
+    rnn_prices = scaler.inverse_transform(rnn_pred.reshape(-1, 1))
+    lstm_prices = scaler.inverse_transform(lstm_pred.reshape(-1, 1))
+    title = f"{forecast_days}-Day Prediction: Actual vs Predicted"
+    if report is not None:
+        report.predictions(f'multistep_prediction_{forecast_days}d.png', actual,
+                           {'SimpleRNN Predicted': rnn_prices, 'LSTM Predicted': lstm_prices},
+                           title)
+        continue
     plt.figure(figsize=(10, 4))
-    plt.plot(scaler.inverse_transform(y_test.reshape(-1, 1)), label="Actual")
-    plt.plot(scaler.inverse_transform(rnn_pred.reshape(-1, 1)), label="SimpleRNN Predicted")
-    plt.plot(scaler.inverse_transform(lstm_pred.reshape(-1, 1)), label="LSTM Predicted")
-    plt.title(f"{forecast_days}-Day Prediction: Actual vs Predicted")
+    plt.plot(actual, label="Actual")
+    plt.plot(rnn_prices, label="SimpleRNN Predicted")
+    plt.plot(lstm_prices, label="LSTM Predicted")
+    plt.title(title)
     plt.legend()
     plt.show()
 
+if report is not None:
+    print("Figures written:", *report.close(), sep="\n  ")
+
 # 9. Final Evaluation Table
 results_df = pd.DataFrame(results).T
 print("\n🔍 Final Evaluation Metrics (MSE):")
@@ -470,98 +434,102 @@ import numpy as np
 import matplotlib.pyplot as plt
 from sklearn.preprocessing import MinMaxScaler
 from sklearn.metrics import mean_squared_error
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Dense, LSTM, Dropout, Bidirectional
+from stock_prediction.windows import MultiHorizonWindows
+from stock_prediction.data import load_features
+from stock_prediction.instrument import RunMetrics, keras_callback
+from stock_prediction.reporting import ReportRenderer, is_headless
+from stock_prediction.models import (build_bilstm, fit_multi_horizon, head_name,
+                                     predict_multi_horizon)
 from tensorflow.keras.callbacks import EarlyStopping
 from tabulate import tabulate
 
+# Stage timings (load, clean, feature, scale, window, fit, ...), per-epoch
+# throughput and MSE go to run_metrics.jsonl
+metrics = RunMetrics('run_metrics.jsonl', section='bidirectional_lstm')
+
 # ================== 2. Load & Feature Engineering ==================
-df = pd.read_csv('/content/AAPL.csv')
-df['Date'] = pd.to_datetime(df['Date'])
-df.set_index('Date', inplace=True)
-
-df = df[['Adj Close']].copy()
-df['MA10'] = df['Adj Close'].rolling(window=10).mean()
-df['MA50'] = df['Adj Close'].rolling(window=50).mean()
-df['Returns'] = df['Adj Close'].pct_change()
-
-def compute_RSI(series, window=14):
-    delta = series.diff()
-    gain = delta.clip(lower=0)
-    loss = -delta.clip(upper=0)
-    avg_gain = gain.rolling(window).mean()
-    avg_loss = loss.rolling(window).mean()
-    rs = avg_gain / avg_loss
-    return 100 - (100 / (1 + rs))
-
-df['RSI'] = compute_RSI(df['Adj Close'])
-df.dropna(inplace=True)
+# 'Adj Close' + MA10, MA50, Returns and RSI (see stock_prediction.features),
+# served from the on-disk cache when the CSV has not changed
+df = load_features('/content/AAPL.csv', features=['MA10', 'MA50', 'Returns', 'RSI'],
+                   metrics=metrics)
 
 # ================== 3. Scale ==================
-scaler = MinMaxScaler()
-scaled_data = scaler.fit_transform(df)
+with metrics.stage('scale'):
+    scaler = MinMaxScaler()
+    scaled_data = scaler.fit_transform(df)
 
 # For inverse scaling only on 'Adj Close'
 adj_scaler = MinMaxScaler()
 adj_scaler.min_, adj_scaler.scale_ = scaler.min_[0], scaler.scale_[0]
 
 # ================== 4. Sequence Generator ==================
-def create_sequences(data, window_size, future_step):
-    X, y = [], []
-    for i in range(len(data) - window_size - future_step + 1):
-        X.append(data[i:i+window_size])
-        y.append(data[i+window_size+future_step-1][0])  # only 'Adj Close'
-    return np.array(X), np.array(y)
+# Input windows shared by the 1, 5 and 10-day models
+window_size = 60
+train_size = int(len(scaled_data) * 0.8)
+with metrics.stage('window'):
+    windows = MultiHorizonWindows(scaled_data, window_size, [1, 5, 10], target_col=0)
 
 # ================== 5. Modeling Function ==================
-def train_predict_model(future_day):
-    print(f"\n🚀 Training {future_day}-Day Prediction Model...")
-    window_size = 60
-    train_size = int(len(scaled_data) * 0.8)
-
-    train_data = scaled_data[:train_size]
-    test_data = scaled_data[train_size - window_size:]
-
-    X_train, y_train = create_sequences(train_data, window_size, future_day)
-    X_test, y_test = create_sequences(test_data, window_size, future_day)
-
-    model = Sequential([
-        Bidirectional(LSTM(64, return_sequences=True), input_shape=(X_train.shape[1], X_train.shape[2])),
-        Dropout(0.3),
-        LSTM(32),
-        Dropout(0.2),
-        Dense(1)
-    ])
-
-    model.compile(optimizer='adam', loss='mse')
+def train_predict_models(steps):
+    """One Bidirectional LSTM with a head per horizon, trained in a single fit."""
+    print(f"\n🚀 Training one model for the {steps}-day horizons...")
+    model = build_bilstm(window_size, scaled_data.shape[1], units=64, horizons=steps)
 
+    n_fit = train_size - window_size - max(steps) + 1
     early_stop = EarlyStopping(monitor='val_loss', patience=5, restore_best_weights=True)
-    history = model.fit(X_train, y_train, epochs=50, batch_size=32,
-                        validation_split=0.1, verbose=0, callbacks=[early_stop])
-
-    pred = model.predict(X_test)
-    pred_rescaled = adj_scaler.inverse_transform(pred)
-    y_test_rescaled = adj_scaler.inverse_transform(y_test.reshape(-1, 1))
-    mse = mean_squared_error(y_test_rescaled, pred_rescaled)
-
-    print(f"✅ {future_day}-Day MSE: {mse:.4f}")
-
-    return y_test_rescaled, pred_rescaled, history, mse
+    epoch_log = keras_callback(metrics, n_fit - int(n_fit * 0.1))
+    with metrics.stage('fit', horizons=list(steps)):
+        history = fit_multi_horizon(model, windows, train_size, epochs=50, batch_size=32,
+                                    validation_split=0.1, verbose=0,
+                                    callbacks=[early_stop, epoch_log])
+
+    with metrics.stage('predict', horizons=list(steps)):
+        forecasts = predict_multi_horizon(model, windows, train_size)
+
+    out = {}
+    for future_day in steps:
+        y_test, pred = forecasts[future_day]
+        with metrics.stage('inverse_transform', horizon=future_day):
+            pred_rescaled = adj_scaler.inverse_transform(pred)
+            y_test_rescaled = adj_scaler.inverse_transform(y_test)
+        with metrics.stage('evaluate', horizon=future_day):
+            mse = mean_squared_error(y_test_rescaled, pred_rescaled)
+
+        metrics.log('result', horizon=future_day, MSE=mse)
+        print(f"✅ {future_day}-Day MSE: {mse:.4f}")
+
+        # this horizon's head loss curves
+        head = head_name(future_day)
+        loss = {'loss': history.history[f'{head}_loss'],
+                'val_loss': history.history[f'val_{head}_loss']}
+        out[future_day] = (y_test_rescaled, pred_rescaled, loss, mse)
+    return out
 
 # ================== 6. Train All Models ==================
+# With a non-interactive matplotlib backend (e.g. Agg on a server) the figures
+# are rendered to reports/ in background workers instead of plt.show()
+report = ReportRenderer('reports') if is_headless() else None
+
 results = {}
 mse_summary = []
+trained = train_predict_models([1, 5, 10])
 for step in [1, 5, 10]:
-    actual, predicted, hist, mse = train_predict_model(step)
+    actual, predicted, hist, mse = trained[step]
     results[step] = {
         'actual': actual,
         'predicted': predicted,
         'history': hist
     }
+    if report is not None:
+        report.predictions(f'bilstm_prediction_{step}d.png', actual,
+                           {f'Predicted Price ({step}-Day Ahead)': predicted},
+                           f'Apple Stock Price Prediction ({step}-Day Ahead)')
+        report.history(f'bilstm_loss_{step}d.png', hist, f'{step}-Day Model Loss')
     mse_summary.append([f"{step}-Day", f"{mse:.4f}"])
 
 # ================== 7. Plot Results ==================
-for step in [1, 5, 10]:
+plot_steps = [] if report is not None else [1, 5, 10]  # already rendered when headless
+for step in plot_steps:
     actual = results[step]['actual']
     predicted = results[step]['predicted']
 
@@ -577,12 +545,12 @@ for step in [1, 5, 10]:
     plt.show()
 
 # ================== 8. Plot Training Loss ==================
-for step in [1, 5, 10]:
+for step in plot_steps:
     history = results[step]['history']
 
     plt.figure(figsize=(8, 4))
-    plt.plot(history.history['loss'], label='Train Loss')
-    plt.plot(history.history['val_loss'], label='Val Loss')
+    plt.plot(history['loss'], label='Train Loss')
+    plt.plot(history['val_loss'], label='Val Loss')
     plt.title(f'{step}-Day Model Loss')
     plt.xlabel('Epochs')
     plt.ylabel('Loss')
@@ -591,6 +559,9 @@ for step in [1, 5, 10]:
     plt.tight_layout()
     plt.show()
 
+if report is not None:
+    print("Figures written:", *report.close(), sep="\n  ")
+
 # ================== 9. MSE Summary Table ==================
 print("\n📊 Final MSE Summary (Bidirectional LSTM):")
 print(tabulate(mse_summary, headers=["Forecast Horizon", "MSE"], tablefmt="fancy_grid"))
@@ -607,76 +578,73 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from sklearn.preprocessing import MinMaxScaler
 from sklearn.metrics import mean_squared_error
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Dense, LSTM, SimpleRNN, Dropout
+from stock_prediction.windows import MultiHorizonWindows
+from stock_prediction.data import load_features
+from stock_prediction.models import build_simplernn, build_lstm, fit_multi_horizon, head_name
+from stock_prediction.reporting import ReportRenderer, is_headless
 from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint
 
 # Load dataset
-df = pd.read_csv('AAPL.csv')
-df['Date'] = pd.to_datetime(df['Date'])
-df.set_index('Date', inplace=True)
-df = df[['Adj Close']].copy()
-
-# Handle missing values
-df = df.fillna(method='ffill')
+# Handle missing values by forward-filling
+df = load_features('AAPL.csv', features=[], fill='ffill')
 
 # Normalize data
 scaler = MinMaxScaler()
 df_scaled = scaler.fit_transform(df)
 
-# Function to create sequences
-def create_sequences(data, window_size, forecast_horizon):
-    X, y = [], []
-    for i in range(len(data) - window_size - forecast_horizon + 1):
-        X.append(data[i:i + window_size])
-        y.append(data[i + window_size + forecast_horizon - 1])
-    return np.array(X), np.array(y)
-
-# Create train/test splits
-def prepare_data(forecast_days):
-    window_size = 60
-    X, y = create_sequences(df_scaled, window_size, forecast_days)
-    split = int(len(X) * 0.8)
-    return X[:split], y[:split], X[split:], y[split:], window_size
-
-# Build and train models
-def build_model(model_type, input_shape, units=50, dropout=0.2):
-    model = Sequential()
-    if model_type == 'SimpleRNN':
-        model.add(SimpleRNN(units, return_sequences=False, input_shape=input_shape))
-    elif model_type == 'LSTM':
-        model.add(LSTM(units, return_sequences=False, input_shape=input_shape))
-    model.add(Dropout(dropout))
-    model.add(Dense(1))
-    model.compile(optimizer='adam', loss='mean_squared_error')
-    return model
-
-# Train, evaluate, and plot predictions
-def train_and_evaluate(forecast_days):
-    X_train, y_train, X_test, y_test, window_size = prepare_data(forecast_days)
-    input_shape = (X_train.shape[1], 1)
-
-    models = {'SimpleRNN': build_model('SimpleRNN', input_shape),
-              'LSTM': build_model('LSTM', input_shape)}
+# Input windows shared by every forecast horizon
+windows = MultiHorizonWindows(df_scaled, 60, [1, 5, 10])
+
+# Build and train models: one shared-encoder model per architecture with a
+# head for each horizon, so each is fitted once for all forecast lengths
+def build_model(model_type, horizons, units=50, dropout=0.2):
+    builder = build_simplernn if model_type == 'SimpleRNN' else build_lstm
+    return builder(60, units=units, dropout_rate=dropout, horizons=horizons)
+
+# Create train/test splits: each horizon is tested on the last 20% of its
+# own windows, and the shared model trains on the windows whose targets all
+# fall before the first test target of any horizon
+splits = {h: int(windows.n_valid(h) * 0.8) for h in windows.horizons}
+train_size = min(splits[h] + 60 + h - 1 for h in windows.horizons)
+test_start = min(splits.values())
+
+forecasts = {}
+for name in ['SimpleRNN', 'LSTM']:
+    model = build_model(name, [1, 5, 10])
+    early_stop = EarlyStopping(monitor='val_loss', patience=5)
+    checkpoint = ModelCheckpoint(f'{name}_best_model.h5', save_best_only=True)
+    fit_multi_horizon(model, windows, train_size, epochs=30, batch_size=32,
+                      validation_split=0.1, callbacks=[early_stop, checkpoint], verbose=0)
+    preds = model.predict(windows.X[test_start:], verbose=0)
+    forecasts[name] = {}
+    for h, split in splits.items():
+        _, y = windows.rows(h)
+        pred = preds[head_name(h)][split - test_start:len(y) - test_start]
+        forecasts[name][h] = (y[split:].reshape(-1, 1), pred)
+
+# Evaluate and plot predictions
+report = ReportRenderer('reports') if is_headless() else None
 
-    history = {}
+def train_and_evaluate(forecast_days):
     results = {}
-
-    for name, model in models.items():
-        early_stop = EarlyStopping(monitor='val_loss', patience=5)
-        checkpoint = ModelCheckpoint(f'{name}_best_model_{forecast_days}.h5', save_best_only=True)
-        hist = model.fit(X_train, y_train, epochs=30, batch_size=32,
-                         validation_split=0.1, callbacks=[early_stop, checkpoint], verbose=0)
-        pred = model.predict(X_test)
+    for name, by_horizon in forecasts.items():
+        y_test, pred = by_horizon[forecast_days]
         mse = mean_squared_error(y_test, pred)
         results[name] = mse
-        history[name] = hist
 
         # Plot
+        actual = scaler.inverse_transform(y_test.reshape(-1, 1))
+        predicted = scaler.inverse_transform(pred)
+        title = f'{name} Prediction - {forecast_days}-Day Forecast'
+        if report is not None:
+            report.predictions(f'{name.lower()}_forecast_{forecast_days}d.png', actual,
+                               {f'Predicted ({name})': predicted}, title,
+                               xlabel='Time', ylabel='Adj Close Price')
+            continue
         plt.figure(figsize=(10,4))
-        plt.plot(scaler.inverse_transform(y_test.reshape(-1, 1)), label='Actual')
-        plt.plot(scaler.inverse_transform(pred), label=f'Predicted ({name})')
-        plt.title(f'{name} Prediction - {forecast_days}-Day Forecast')
+        plt.plot(actual, label='Actual')
+        plt.plot(predicted, label=f'Predicted ({name})')
+        plt.title(title)
         plt.xlabel('Time')
         plt.ylabel('Adj Close Price')
         plt.legend()
@@ -690,6 +658,9 @@ for days in [1, 5, 10]:
     result = train_and_evaluate(days)
     results_summary[days] = result
 
+if report is not None:
+    print("Figures written:", *report.close(), sep="\n  ")
+
 # Display results summary
 summary_df = pd.DataFrame(results_summary).T
 summary_df.columns = ['SimpleRNN MSE', 'LSTM MSE']
@@ -0,0 +1,40 @@
+"""Reusable building blocks for the Apple stock price prediction project.
+
+Submodules are imported on first attribute access, so ``import
+stock_prediction`` (and the command-line entry point) does not pay for
+pandas, scikit-learn or TensorFlow until they are needed.
+"""
+
+import importlib
+
+_EXPORTS = {
+    'Ensemble': 'ensemble',
+    'FeatureEngine': 'features',
+    'MultiHorizonWindows': 'windows',
+    'NumpyModel': 'inference',
+    'RollingMean': 'features',
+    'Seq2SeqForecaster': 'seq2seq',
+    'StreamingPredictor': 'streaming',
+    'add_features': 'features',
+    'compute_RSI': 'features',
+    'export_model': 'inference',
+    'load_features': 'data',
+    'load_prices': 'data',
+    'mc_forecast': 'uncertainty',
+    'make_windows': 'windows',
+    'panel_features': 'features',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(f'.{_EXPORTS[name]}', __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
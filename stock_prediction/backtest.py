@@ -0,0 +1,121 @@
+"""Walk-forward backtesting with warm-started retraining.
+
+History is cut at ``initial_train`` and then every ``retrain_every`` bars.
+At each cut the model is trained on every window whose target was already
+observed and scored on the next ``retrain_every`` forecasts, the way it
+would be used when retrained on a schedule in production. Fold 0 trains
+from scratch. Later folds keep the previous fold's weights and only run
+``warm_epochs`` more epochs. Each fold refits the scaler on its training
+rows only, so no fold is scaled with the minimum or maximum of prices it
+has not seen yet.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import MinMaxScaler
+
+from .training import check_fit_budget, inverse_target, predict_in_chunks
+from .windows import MultiHorizonWindows
+
+
+def fold_bounds(n_bars, initial_train, retrain_every):
+    """Cut points ``t`` (first unseen bar) for every walk-forward fold."""
+    if initial_train >= n_bars:
+        raise ValueError("initial_train must be smaller than the series length")
+    return list(range(initial_train, n_bars, retrain_every))
+
+
+def walk_forward(prepared, horizon, model='LSTM', initial_train=None,
+                 retrain_every=60, max_train=None, epochs=20, warm_epochs=3,
+                 batch_size=32, validation_split=0.1, patience=5, verbose=0,
+                 **model_params):
+    """Backtest one architecture at one horizon.
+
+    ``prepared`` comes from :func:`~stock_prediction.training.prepare_data`.
+    ``model`` is any key of ``models.BUILDERS``. For ``'Seq2Seq'`` the
+    target is the block of the next ``horizon`` prices, as in the script's
+    seq2seq section. ``max_train`` switches from an expanding to a rolling
+    training window of that many samples. The scaler is refitted in every
+    fold on the bars its training windows cover, which all come before the
+    cut.
+
+    Returns ``(folds, summary)``. ``folds`` is a DataFrame with one row per
+    fold and ``summary`` holds the pooled and mean per-fold MSE in price
+    units.
+    """
+    from tensorflow.keras.callbacks import EarlyStopping
+
+    from .models import BUILDERS
+
+    values = prepared.frame.to_numpy()
+    window_size = prepared.windows.window_size
+    n_samples = len(values) - window_size - horizon + 1
+    n_features = values.shape[1]
+    if model == 'Seq2Seq':
+        net = BUILDERS[model](window_size, n_features, outputs=horizon, **model_params)
+    else:
+        net = BUILDERS[model](window_size, n_features, **model_params)
+
+    if initial_train is None:
+        initial_train = prepared.train_size
+    index = prepared.frame.index
+
+    rows, actual, predicted = [], [], []
+    for fold, cut in enumerate(fold_bounds(len(values), initial_train, retrain_every)):
+        n_train = cut - window_size - horizon + 1
+        test = slice(cut - window_size, min(cut - window_size + retrain_every, n_samples))
+        if n_train < 1 or test.start >= test.stop:
+            continue
+        first = 0 if max_train is None else max(0, n_train - max_train)
+
+        # scale the fold's bars with a scaler fitted on its training bars only
+        scaler = MinMaxScaler().fit(values[first:cut])
+        last = test.stop - 1 + window_size + horizon
+        scaled = scaler.transform(values[first:last]).astype(values.dtype, copy=False)
+        # targets for every step up to ``horizon``; X is a view of the fold's data
+        windows = MultiHorizonWindows(scaled, window_size, range(1, horizon + 1),
+                                      target_col=0)
+        X, Y = windows.rows(horizon, steps=True)
+        y = Y[..., None] if model == 'Seq2Seq' else Y[:, -1]
+        train = slice(0, n_train - first)
+        test = slice(test.start - first, test.stop - first)
+
+        check_fit_budget(X[train], y[train])
+        start = time.perf_counter()
+        # only the first trained fold starts from scratch
+        history = net.fit(X[train], y[train], epochs=warm_epochs if rows else epochs,
+                          batch_size=batch_size, validation_split=validation_split,
+                          verbose=verbose,
+                          callbacks=[EarlyStopping(monitor='val_loss', patience=patience,
+                                                   restore_best_weights=True)])
+        fit_seconds = time.perf_counter() - start
+
+        pred = predict_in_chunks(net, X[test]).reshape(-1, 1)
+        true = np.asarray(y[test]).reshape(-1, 1)
+        pred, true = inverse_target(scaler, pred), inverse_target(scaler, true)
+        actual.append(true)
+        predicted.append(pred)
+        rows.append({'fold': fold, 'train_end': index[cut - 1],
+                     'n_train': train.stop - train.start, 'n_test': test.stop - test.start,
+                     'epochs': len(history.history['loss']), 'fit_seconds': fit_seconds,
+                     'MSE': float(np.mean((true - pred) ** 2))})
+
+    if not rows:
+        raise ValueError("no complete fold; lower initial_train or retrain_every")
+    folds = pd.DataFrame(rows)
+    actual, predicted = np.concatenate(actual), np.concatenate(predicted)
+    summary = {'model': model, 'horizon': horizon, 'folds': len(folds),
+               'MSE': float(np.mean((actual - predicted) ** 2)),
+               'mean_fold_MSE': float(folds['MSE'].mean()),
+               'fit_seconds': float(folds['fit_seconds'].sum())}
+    return folds, summary
+
+
+def compare_models(prepared, horizons=(1, 5, 10),
+                   models=('SimpleRNN', 'LSTM', 'BiLSTM', 'Seq2Seq'), **kwargs):
+    """Walk-forward every model at every horizon; returns the summary table."""
+    summaries = [walk_forward(prepared, h, m, **kwargs)[1]
+                 for h in horizons for m in models]
+    return pd.DataFrame(summaries)
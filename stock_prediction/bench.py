@@ -0,0 +1,273 @@
+"""Reproducible benchmarks for every pipeline stage.
+
+Runs on a synthetic random-walk price history of configurable length,
+feature count and ticker count. For each stage it records the best wall
+time over ``repeat`` runs and the peak Python/NumPy heap allocation seen by
+``tracemalloc``. TensorFlow's own allocator is not visible to
+``tracemalloc``, so the training and predict stages report time only.
+Results are written as JSON and can be compared against a stored
+baseline::
+
+    python -m stock_prediction.bench --bars 5000 --out bench.json
+    python -m stock_prediction.bench --bars 5000 --baseline bench.json
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from .data import clean_prices, load_prices
+from .features import add_features, panel_features
+from .windows import make_windows
+
+BASE_FEATURES = ['MA10', 'MA50', 'Returns', 'RSI']
+
+# config keys that change the work measured; runs must agree on them to compare
+COMPARABLE = ('n_bars', 'n_features', 'n_tickers', 'window_size', 'horizon', 'dtype',
+              'epochs', 'batch_size')
+
+
+def synthetic_prices(n_bars=5000, n_tickers=1, seed=0, missing=0.001):
+    """Yahoo-style OHLCV frame(s) from a seeded geometric random walk.
+
+    Returns one DataFrame per ticker with a 'Date' column, the usual price
+    columns and a small fraction of missing 'Adj Close' values.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('1990-01-01', periods=n_bars)
+    frames = []
+    for _ in range(n_tickers):
+        close = 50 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, n_bars)))
+        adj = close.copy()
+        adj[rng.random(n_bars) < missing] = np.nan
+        frames.append(pd.DataFrame({
+            'Date': dates, 'Open': close * (1 + rng.normal(0, 0.005, n_bars)),
+            'High': close * 1.01, 'Low': close * 0.99, 'Close': close,
+            'Adj Close': adj, 'Volume': rng.integers(10**6, 10**8, n_bars)}))
+    return frames
+
+
+def feature_list(n_features):
+    """``n_features`` input columns: 'Adj Close' plus MA/Returns/RSI features."""
+    features = BASE_FEATURES[:max(n_features - 1, 0)]
+    window = 5
+    while len(features) < n_features - 1:
+        name = f'MA{window}'
+        if name not in features:
+            features.append(name)
+        window += 5
+    return features
+
+
+def measure(fn, repeat=3, track_memory=True):
+    """Best-of-``repeat`` wall time and peak traced allocation of ``fn()``."""
+    best, peak, result = float('inf'), 0, None
+    for _ in range(repeat):
+        result = None
+        gc.collect()
+        if track_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+        if track_memory:
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+    stats = {'seconds': best}
+    if track_memory:
+        stats['peak_mb'] = peak / 2**20
+    return stats, result
+
+
+def _legacy_windows(data, window_size, horizon):
+    # the Python-loop create_sequences the script used before make_windows
+    X, y = [], []
+    for i in range(len(data) - window_size - horizon + 1):
+        X.append(data[i:i + window_size])
+        y.append(data[i + window_size + horizon - 1])
+    return np.array(X), np.array(y)
+
+
+def run(n_bars=5000, n_features=5, n_tickers=1, window_size=60, horizon=10,
+        models=('SimpleRNN', 'LSTM', 'BiLSTM', 'Seq2Seq'), epochs=2, batch_size=32,
+        repeat=3, train=True, seed=0, dtype='float32'):
+    """Run every stage and return the JSON-serialisable results dict."""
+    from sklearn.preprocessing import MinMaxScaler
+
+    features = feature_list(n_features)
+    results = {}
+    frames = synthetic_prices(n_bars, n_tickers, seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i, frame in enumerate(frames):
+            paths.append(os.path.join(tmp, f'T{i}.csv'))
+            frame.to_csv(paths[-1], index=False)
+
+        results['csv_load'], raw = measure(
+            lambda: [pd.read_csv(p, parse_dates=['Date'], index_col='Date') for p in paths],
+            repeat)
+        results['csv_load_columns'], _ = measure(
+            lambda: [load_prices(p) for p in paths], repeat)
+
+    results['clean'], cleaned = measure(
+        lambda: [clean_prices(df[['Adj Close']]) for df in raw], repeat)
+    results['features'], featured = measure(
+        lambda: [add_features(df, features).dropna() for df in cleaned], repeat)
+    if n_tickers > 1:
+        panel = pd.concat([df['Adj Close'] for df in cleaned], axis=1, sort=True)
+        results['features_panel'], _ = measure(
+            lambda: panel_features(panel, features), repeat)
+
+    data = featured[0].astype(dtype)
+    results['scale'], scaled = measure(lambda: MinMaxScaler().fit_transform(data), repeat)
+    results['windows_loop'], _ = measure(
+        lambda: _legacy_windows(scaled, window_size, horizon), repeat)
+    results['windows'], (X, y) = measure(
+        lambda: make_windows(scaled, window_size, horizon, target_col=0), repeat)
+    results['windows_seq2seq'], _ = measure(
+        lambda: make_windows(scaled, window_size, output_length=horizon, target_col=0),
+        repeat)
+    results['windows_materialize'], _ = measure(
+        lambda: make_windows(scaled, window_size, horizon, target_col=0,
+                             materialize=True), repeat)
+
+    if train:
+        results.update(_model_stages(X, y, scaled, window_size, horizon, models,
+                                     epochs, batch_size, repeat))
+
+    return {'config': {'n_bars': n_bars, 'n_features': n_features, 'n_tickers': n_tickers,
+                       'window_size': window_size, 'horizon': horizon,
+                       'epochs': epochs, 'batch_size': batch_size, 'seed': seed,
+                       'dtype': np.dtype(dtype).name},
+            'environment': {'python': platform.python_version(),
+                            'numpy': np.__version__, 'pandas': pd.__version__,
+                            'machine': platform.machine(), 'cpus': os.cpu_count()},
+            'results': results}
+
+
+def _model_stages(X, y, scaled, window_size, horizon, models, epochs, batch_size,
+                  repeat):
+    from .models import BUILDERS
+
+    results = {}
+    X = np.ascontiguousarray(X)
+    for name in models:
+        if name == 'Seq2Seq':
+            Xm, ym = make_windows(scaled, window_size, output_length=horizon,
+                                  target_col=0, materialize=True)
+            ym = ym[..., None]
+            net = BUILDERS[name](window_size, X.shape[-1], outputs=horizon)
+        else:
+            Xm, ym = X, y
+            net = BUILDERS[name](window_size, X.shape[-1])
+
+        # the first epoch includes graph tracing, so it is reported separately
+        start = time.perf_counter()
+        net.fit(Xm, ym, epochs=1, batch_size=batch_size, verbose=0)
+        first = time.perf_counter() - start
+        epoch_times = []
+        for _ in range(epochs):
+            start = time.perf_counter()
+            net.fit(Xm, ym, epochs=1, batch_size=batch_size, verbose=0)
+            epoch_times.append(time.perf_counter() - start)
+        results[f'train_{name}'] = {'first_epoch_seconds': first,
+                                    'seconds': min(epoch_times),
+                                    'samples_per_sec': len(Xm) / min(epoch_times)}
+
+        net.predict(Xm[:batch_size], verbose=0)
+        results[f'predict_batch_{name}'], _ = measure(
+            lambda: net.predict(Xm, batch_size=256, verbose=0), repeat, track_memory=False)
+        results[f'predict_batch_{name}']['samples_per_sec'] = (
+            len(Xm) / results[f'predict_batch_{name}']['seconds'])
+        sample = Xm[-1:]
+        results[f'predict_single_{name}'], _ = measure(
+            lambda: net.predict(sample, verbose=0), repeat, track_memory=False)
+        net(sample, training=False)
+        results[f'call_single_{name}'], _ = measure(
+            lambda: net(sample, training=False), repeat, track_memory=False)
+    return results
+
+
+def compare(current, baseline, tolerance=0.10):
+    """Per-stage time/memory ratios of ``current`` over ``baseline``.
+
+    A stage is flagged as a regression when either ratio exceeds
+    ``1 + tolerance``. Raises ``ValueError`` if the two runs were made with
+    different :data:`COMPARABLE` settings, since their timings then measure
+    different work.
+    """
+    ours, theirs = current.get('config', {}), baseline.get('config', {})
+    differ = [f"{key}: {ours.get(key)!r} vs baseline {theirs.get(key)!r}"
+              for key in COMPARABLE if ours.get(key) != theirs.get(key)]
+    if differ:
+        raise ValueError("runs are not comparable (" + "; ".join(differ) + ")")
+    rows = []
+    for stage, stats in current['results'].items():
+        base = baseline['results'].get(stage)
+        if base is None:
+            continue
+        row = {'stage': stage, 'seconds': stats['seconds'],
+               'baseline_seconds': base['seconds'],
+               'time_ratio': stats['seconds'] / base['seconds']}
+        if 'peak_mb' in stats and base.get('peak_mb'):
+            row['memory_ratio'] = stats['peak_mb'] / base['peak_mb']
+        row['regression'] = max(row['time_ratio'], row.get('memory_ratio', 0)) > 1 + tolerance
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--bars', type=int, default=5000)
+    parser.add_argument('--features', type=int, default=5,
+                        help="input columns including 'Adj Close'")
+    parser.add_argument('--tickers', type=int, default=1)
+    parser.add_argument('--window-size', type=int, default=60)
+    parser.add_argument('--horizon', type=int, default=10)
+    parser.add_argument('--models', nargs='+',
+                        default=['SimpleRNN', 'LSTM', 'BiLSTM', 'Seq2Seq'])
+    parser.add_argument('--epochs', type=int, default=2)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--dtype', choices=['float32', 'float64'], default='float32')
+    parser.add_argument('--no-train', action='store_true',
+                        help="skip the TensorFlow training/predict stages")
+    parser.add_argument('--out', help="write results JSON here")
+    parser.add_argument('--baseline', help="compare against this results JSON")
+    parser.add_argument('--tolerance', type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    current = run(args.bars, args.features, args.tickers, args.window_size, args.horizon,
+                  args.models, args.epochs, repeat=args.repeat, train=not args.no_train,
+                  seed=args.seed, dtype=args.dtype)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(current, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        try:
+            table = compare(current, baseline, args.tolerance)
+        except ValueError as exc:
+            print(f"cannot compare with {args.baseline}: {exc}", file=sys.stderr)
+            return 2
+        print(table.to_string(index=False))
+        return 1 if table['regression'].any() else 0
+
+    print(json.dumps(current['results'], indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
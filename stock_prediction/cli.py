@@ -0,0 +1,348 @@
+"""Command-line entry point: ``stock-prediction <command>`` or ``python -m stock_prediction``.
+
+Commands:
+
+    ingest    parse price CSVs into the feature cache or one consolidated dataset
+    features  compute features and print or save them
+    train     train (or reuse from the registry) one model per horizon
+    predict   forecast from the latest window with a registered model
+    export    write a registered model and its scaler for NumPy-only inference
+    serve     local micro-batching prediction server for exported models
+    backtest  walk-forward backtest of one or more architectures
+    report    summarise a run-metrics JSON-lines file, render price charts
+
+Heavy libraries are imported inside the command that needs them. Argument
+parsing and ``--help`` never load pandas or TensorFlow, and the data-only
+commands never load TensorFlow.
+"""
+
+import argparse
+import json
+import sys
+
+DEFAULT_FEATURES = ['MA10', 'MA50', 'Returns', 'RSI']
+MODELS = ['SimpleRNN', 'LSTM', 'BiLSTM', 'Seq2Seq']
+
+
+def _add_data_args(parser, features=DEFAULT_FEATURES, cache_flag=False, nargs=None):
+    parser.add_argument('csv', nargs=nargs,
+                        help="Yahoo-style price CSV with 'Date' and 'Adj Close'")
+    parser.add_argument('--features', nargs='*', default=features,
+                        help="feature columns to add (MA<n>, Returns, RSI)")
+    parser.add_argument('--fill', choices=['drop', 'ffill'], default='drop',
+                        help="how to handle missing prices")
+    parser.add_argument('--dtype', choices=['float32', 'float64'], default='float32',
+                        help="dtype of prices, features and windows")
+    if cache_flag:
+        parser.add_argument('--no-cache', action='store_true',
+                            help="bypass the feature cache")
+
+
+def _add_model_args(parser):
+    parser.add_argument('--model', choices=MODELS[:3], default='LSTM')
+    parser.add_argument('--window-size', type=int, default=60)
+    parser.add_argument('--registry', help="model registry directory")
+
+
+def _prepare(args, horizons, **kwargs):
+    from .training import prepare_data
+
+    return prepare_data(args.csv, args.features, args.window_size, horizons,
+                        fill=args.fill, dtype=args.dtype, **kwargs)
+
+
+def cmd_ingest(args):
+    if args.out:
+        from .ingest import ingest
+
+        meta = ingest(args.csv, args.out, columns=args.columns, fill=args.fill,
+                      dtype=args.dtype, max_workers=args.workers, chunksize=args.chunksize)
+        n_rows = sum(stop - start for start, stop in meta['tickers'].values())
+        print(f"{len(meta['tickers'])} tickers, {n_rows} rows x {len(args.columns)} "
+              f"columns -> {args.out}")
+        return 0
+    if len(args.csv) > 1:
+        print("several CSVs need --out DATASET_DIR", file=sys.stderr)
+        return 2
+    args.csv = args.csv[0]
+
+    from .data import load_features
+
+    df = load_features(args.csv, features=args.features, fill=args.fill,
+                       use_cache=not args.no_cache, dtype=args.dtype)
+    print(f"{len(df)} rows x {len(df.columns)} columns "
+          f"({df.index.min().date()} .. {df.index.max().date()})")
+
+
+def cmd_features(args):
+    from .data import load_features
+
+    df = load_features(args.csv, features=args.features, fill=args.fill,
+                       use_cache=not args.no_cache, dtype=args.dtype)
+    if args.out:
+        df.to_csv(args.out)
+    else:
+        print(df.tail(args.tail).to_string())
+
+
+def cmd_train(args):
+    from .instrument import RunMetrics
+    from .registry import ModelRegistry
+
+    if args.intra_op_threads is not None or args.inter_op_threads is not None:
+        from .pipeline import configure_threads
+
+        configure_threads(args.intra_op_threads, args.inter_op_threads)
+    options = {}
+    if args.tf_data:
+        options.update(tf_data=True, threads=args.input_threads)
+    with RunMetrics(args.metrics, command='train') as metrics:
+        prepared = _prepare(args, args.horizons, out_of_core=args.out_of_core,
+                            metrics=metrics)
+        registry = ModelRegistry(args.registry)
+        for horizon in args.horizons:
+            _, mse, status = registry.fetch_or_train(
+                prepared, horizon, args.model, epochs=args.epochs,
+                batch_size=args.batch_size, out_of_core=args.out_of_core or None,
+                metrics=metrics, **options)
+            row = {'horizon': horizon, 'model': args.model, 'MSE': round(float(mse), 4),
+                   'status': status}
+            rates = [r['samples_per_sec'] for r in metrics.records
+                     if r['event'] == 'epoch' and r.get('horizon') == horizon]
+            if rates:
+                # the first epoch includes graph tracing
+                rates = rates[1:] or rates
+                row['samples_per_sec'] = round(sum(rates) / len(rates), 1)
+            print(json.dumps(row))
+
+
+def _predict_exported(args):
+    from .data import load_features
+    from .inference import NumpyModel
+
+    engine = NumpyModel.load(args.exported)
+    window_size = engine.input_shape[0]
+    if 'features' in engine.meta:
+        # the stored list is the frame's columns, price column included
+        features = [f for f in engine.meta['features'] if f != 'Adj Close']
+    elif args.features is not None:
+        features = args.features
+    else:
+        print(f"{args.exported} does not record its features; pass --features",
+              file=sys.stderr)
+        return 2
+    frame = load_features(args.csv, features=features, fill=args.fill, dtype=args.dtype)
+    pred = engine.forecast(frame.to_numpy()[-window_size:]).ravel()
+    print(json.dumps({'horizon': engine.meta.get('horizon'), 'model': engine.meta.get('model'),
+                      'as_of': str(frame.index[-1].date()), 'forecast': float(pred[0])}))
+    return 0
+
+
+def cmd_predict(args):
+    if args.exported:
+        return _predict_exported(args)
+
+    from .registry import ModelRegistry
+    from .training import inverse_target
+
+    if args.features is None:
+        args.features = DEFAULT_FEATURES
+    prepared = _prepare(args, args.horizons)
+    registry = ModelRegistry(args.registry)
+    window = prepared.scaled[-args.window_size:][None]
+    last_date = prepared.frame.index[-1]
+    for horizon in args.horizons:
+        net, entry = registry.latest(prepared, horizon, args.model)
+        if net is None:
+            print(f"no registered {args.model} model for horizon {horizon}; "
+                  f"run 'train' first", file=sys.stderr)
+            return 1
+        row = {'horizon': horizon, 'model': args.model, 'as_of': str(last_date.date())}
+        if args.mc_samples:
+            from .uncertainty import mc_forecast
+
+            fc = mc_forecast(net, window, args.mc_samples, quantiles=(0.05, 0.95),
+                             inverse_transform=lambda v: inverse_target(prepared.scaler, v))
+            row.update(forecast=float(fc.mean.ravel()[0]), std=float(fc.std.ravel()[0]),
+                       q05=float(fc.quantiles[0.05].ravel()[0]),
+                       q95=float(fc.quantiles[0.95].ravel()[0]))
+        else:
+            pred = inverse_target(prepared.scaler, net.predict(window, verbose=0).ravel())
+            row['forecast'] = float(pred[0])
+        row['trained_rows'] = entry['n_rows']
+        print(json.dumps(row))
+    return 0
+
+
+def cmd_export(args):
+    from .inference import export_model
+    from .registry import ModelRegistry
+
+    prepared = _prepare(args, [args.horizon])
+    net, entry = ModelRegistry(args.registry).latest(prepared, args.horizon, args.model)
+    if net is None:
+        print(f"no registered {args.model} model for horizon {args.horizon}; "
+              f"run 'train' first", file=sys.stderr)
+        return 1
+    export_model(net, prepared.scaler, args.out, horizon=args.horizon, model=args.model,
+                 features=list(prepared.frame.columns), trained_rows=entry['n_rows'])
+    print(f"wrote {args.out}")
+    return 0
+
+
+def cmd_serve(args):
+    from .server import PredictionService, make_server
+
+    service = PredictionService(args.models, args.max_batch, args.max_delay_ms / 1e3)
+    server = make_server(service, args.host, args.port, args.unix)
+    where = args.unix or f"http://{args.host}:{args.port}"
+    print(f"serving {len(service.models)} model(s) on {where}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+    return 0
+
+
+def cmd_backtest(args):
+    from .backtest import compare_models
+
+    prepared = _prepare(args, args.horizons)
+    table = compare_models(prepared, args.horizons, args.models,
+                           retrain_every=args.retrain_every, epochs=args.epochs,
+                           warm_epochs=args.warm_epochs)
+    print(table.to_string(index=False))
+
+
+def cmd_report(args):
+    if args.metrics:
+        import pandas as pd
+
+        with open(args.metrics) as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        stages = pd.DataFrame([r for r in records if r['event'] == 'stage'])
+        if not stages.empty:
+            print(stages.groupby('stage')[['wall_s', 'cpu_s']].agg(['sum', 'count'])
+                  .to_string())
+        results = pd.DataFrame([r for r in records if r['event'] == 'result'])
+        if not results.empty:
+            print(results.drop(columns=['ts', 'event']).to_string(index=False))
+    if args.prices:
+        from .data import load_prices
+        from .reporting import ReportRenderer
+
+        prices = load_prices(args.prices)['Adj Close']
+        with ReportRenderer(args.out) as report:
+            report.predictions('price_history.png', prices.to_numpy(), {},
+                               'Apple Stock - Adjusted Close Price')
+        print(f"wrote {args.out}/price_history.png")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='stock-prediction',
+                                     description="Apple stock price prediction pipeline")
+    parser.add_argument('--memory-budget', metavar='SIZE',
+                        help="largest window array to materialise, e.g. 2G")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('ingest', help="parse CSVs into the feature cache or a dataset")
+    _add_data_args(p, cache_flag=True, nargs='+')
+    p.add_argument('--out', help="write one consolidated binary dataset here instead "
+                                 "of caching features")
+    p.add_argument('--columns', nargs='+', default=['Adj Close'],
+                   help="columns to keep in the dataset")
+    p.add_argument('--workers', type=int, help="files read concurrently")
+    p.add_argument('--chunksize', type=int, default=1_000_000,
+                   help="rows per chunk for large files")
+    p.set_defaults(func=cmd_ingest)
+
+    p = sub.add_parser('features', help="compute and print/save features")
+    _add_data_args(p, cache_flag=True)
+    p.add_argument('--out', help="write the feature frame to this CSV")
+    p.add_argument('--tail', type=int, default=5)
+    p.set_defaults(func=cmd_features)
+
+    p = sub.add_parser('train', help="train or reuse one model per horizon")
+    _add_data_args(p)
+    _add_model_args(p)
+    p.add_argument('--horizons', type=int, nargs='+', default=[1, 5, 10])
+    p.add_argument('--epochs', type=int, default=30)
+    p.add_argument('--batch-size', type=int, default=32)
+    p.add_argument('--out-of-core', action='store_true',
+                   help="keep the scaled data in a memory-mapped cache file and build "
+                        "training windows per batch instead of all at once "
+                        "(windows only: automatic when over --memory-budget)")
+    p.add_argument('--tf-data', action='store_true',
+                   help="feed training through a prefetched tf.data pipeline (windows "
+                        "cached in memory when they fit --memory-budget)")
+    p.add_argument('--input-threads', type=int,
+                   help="private thread pool size for the tf.data pipeline")
+    p.add_argument('--intra-op-threads', type=int,
+                   help="TensorFlow threads per operation (0: TF default)")
+    p.add_argument('--inter-op-threads', type=int,
+                   help="TensorFlow operations run concurrently (0: TF default)")
+    p.add_argument('--metrics', metavar='PATH',
+                   help="append stage timings, epochs and results as JSON lines "
+                        "(see 'report --metrics')")
+    p.set_defaults(func=cmd_train)
+
+    p = sub.add_parser('predict', help="forecast from the latest window")
+    _add_data_args(p)
+    _add_model_args(p)
+    p.add_argument('--horizons', type=int, nargs='+', default=[1, 5, 10])
+    p.add_argument('--exported', help="use this exported model (no TensorFlow) "
+                                      "instead of the registry")
+    p.add_argument('--mc-samples', type=int, default=0,
+                   help="Monte Carlo dropout passes for a 90%% interval (0: point forecast)")
+    # an exported model records its own features; only the registry path defaults them
+    p.set_defaults(func=cmd_predict, features=None)
+
+    p = sub.add_parser('export', help="export a registered model for NumPy inference")
+    _add_data_args(p)
+    _add_model_args(p)
+    p.add_argument('--horizon', type=int, default=1)
+    p.add_argument('--out', required=True, help="output .npz path")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser('serve', help="serve exported models over HTTP")
+    p.add_argument('models', nargs='+', help="exported .npz models")
+    p.add_argument('--host', default='127.0.0.1')
+    p.add_argument('--port', type=int, default=8765)
+    p.add_argument('--unix', help="listen on this Unix socket instead of a port")
+    p.add_argument('--max-batch', type=int, default=64)
+    p.add_argument('--max-delay-ms', type=float, default=2.0,
+                   help="how long to wait for more requests to batch together")
+    p.set_defaults(func=cmd_serve)
+
+    p = sub.add_parser('backtest', help="walk-forward backtest")
+    _add_data_args(p)
+    p.add_argument('--models', nargs='+', choices=MODELS, default=['SimpleRNN', 'LSTM'])
+    p.add_argument('--window-size', type=int, default=60)
+    p.add_argument('--horizons', type=int, nargs='+', default=[1, 5, 10])
+    p.add_argument('--retrain-every', type=int, default=60)
+    p.add_argument('--epochs', type=int, default=20)
+    p.add_argument('--warm-epochs', type=int, default=3)
+    p.set_defaults(func=cmd_backtest)
+
+    p = sub.add_parser('report', help="summarise run metrics / render charts")
+    p.add_argument('--metrics', help="run-metrics JSON-lines file")
+    p.add_argument('--prices', help="price CSV to chart")
+    p.add_argument('--out', default='reports')
+    p.set_defaults(func=cmd_report)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.memory_budget:
+        from .memory import set_memory_budget
+
+        set_memory_budget(args.memory_budget)
+    return args.func(args) or 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""Price loading, cleaning and the on-disk feature cache.
+
+``load_features`` keys its cache on the SHA-256 of the CSV contents plus the
+feature configuration, and stores the cleaned, date-indexed frame as plain
+``.npy`` files that are memory-mapped on load. Repeat runs skip CSV parsing
+and feature computation entirely.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from .features import DEFAULT_FEATURES, add_features
+from .instrument import timed
+from .memory import DEFAULT_DTYPE
+
+CACHE_VERSION = 1
+
+
+def default_cache_dir():
+    return os.environ.get(
+        'STOCK_PREDICTION_CACHE',
+        os.path.join(os.path.expanduser('~'), '.cache', 'stock_prediction'))
+
+
+def file_digest(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def clean_prices(df, fill='drop'):
+    """Drop (``'drop'``) or forward-fill (``'ffill'``) missing values."""
+    if fill == 'drop':
+        return df.dropna()
+    if fill == 'ffill':
+        return df.ffill()
+    raise ValueError(f"fill must be 'drop' or 'ffill', got {fill!r}")
+
+
+def read_prices(path, columns=('Adj Close',)):
+    """Read ``columns`` from a Yahoo-style CSV, indexed by 'Date'."""
+    df = pd.read_csv(path, usecols=['Date', *columns], parse_dates=['Date'],
+                     index_col='Date')
+    return df[list(columns)]
+
+
+def load_prices(path, columns=('Adj Close',), fill='drop'):
+    """:func:`read_prices` followed by :func:`clean_prices`."""
+    return clean_prices(read_prices(path, columns), fill)
+
+
+def cache_key(digest, config):
+    payload = json.dumps({'csv': digest, 'config': config,
+                          'version': CACHE_VERSION}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+def _write_entry(entry, df):
+    # Write into a temp dir and rename so readers never see a partial entry
+    parent = os.path.dirname(entry)
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=parent, prefix='.tmp-')
+    try:
+        np.save(os.path.join(tmp, 'values.npy'), np.ascontiguousarray(df.to_numpy()))
+        np.save(os.path.join(tmp, 'index.npy'), df.index.to_numpy())
+        with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+            json.dump({'columns': list(df.columns), 'index_name': df.index.name}, f)
+        os.replace(tmp, entry)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+        if not os.path.isdir(entry):
+            raise
+
+
+def _read_entry(entry, mmap=True):
+    mode = 'r' if mmap else None
+    values = np.load(os.path.join(entry, 'values.npy'), mmap_mode=mode)
+    index = np.load(os.path.join(entry, 'index.npy'))
+    with open(os.path.join(entry, 'meta.json')) as f:
+        meta = json.load(f)
+    return pd.DataFrame(values, index=pd.DatetimeIndex(index, name=meta['index_name']),
+                        columns=meta['columns'], copy=False)
+
+
+def load_features(path, features=DEFAULT_FEATURES, columns=('Adj Close',),
+                  fill='drop', rsi_window=14, cache_dir=None, use_cache=True,
+                  mmap=True, metrics=None, dtype=DEFAULT_DTYPE):
+    """Load the cleaned, feature-engineered frame for ``path``.
+
+    Equivalent to reading the CSV, cleaning it, adding ``features`` and
+    dropping the warm-up rows, but served from the cache when the same CSV
+    contents and configuration were seen before. Features are computed in
+    float64 and the frame is returned (and cached) as ``dtype``. With
+    ``mmap=True`` the cached values are memory-mapped read-only. ``metrics`` (a
+    :class:`~stock_prediction.instrument.RunMetrics`) times the load, clean
+    and feature stages.
+    """
+    dtype = np.dtype(dtype)
+    config = {'columns': list(columns), 'features': list(features),
+              'fill': fill, 'rsi_window': rsi_window, 'dtype': dtype.name}
+    entry = None
+    if use_cache:
+        key = cache_key(file_digest(path), config)
+        entry = os.path.join(cache_dir or default_cache_dir(), key)
+        if os.path.isfile(os.path.join(entry, 'meta.json')):
+            with timed(metrics, 'load', cache='hit'):
+                return _read_entry(entry, mmap)
+
+    with timed(metrics, 'load', cache='miss' if use_cache else 'off'):
+        df = read_prices(path, columns)
+    with timed(metrics, 'clean'):
+        df = clean_prices(df, fill)
+    if features:
+        with timed(metrics, 'feature'):
+            df = add_features(df, features, columns[0], rsi_window).dropna()
+    df = df.astype(dtype, copy=False)
+
+    if entry is not None:
+        _write_entry(entry, df)
+    return df
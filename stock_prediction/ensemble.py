@@ -0,0 +1,137 @@
+"""Several trained models fused into one inference graph.
+
+Instead of a ``predict`` call per model and horizon, every member is wired
+onto one shared ``Input``, and a frozen ``Dense`` layer per horizon takes the
+weighted average of their forecasts. The whole ensemble is then a single
+batched graph call per chunk of windows::
+
+    ens = Ensemble({'RNN': {1: rnn_1, 5: rnn_5},        # one model per horizon
+                    'LSTM': lstm_multi,                 # heads h1, h5
+                    'Seq2Seq': seq2seq_5},              # (N, 5, 1) steps
+                   horizons=(1, 5), weights={'LSTM': 2})
+    out = ens.predict(X_test)
+    out[5]['ensemble'], out[5]['RNN']
+
+A member is a multi-output model (head ``h<horizon>`` is used), a
+sequence model with output ``(N, steps, 1)`` (step ``horizon`` is used),
+a single-output model (only with one horizon), or a ``{horizon: model}``
+dict of these. All members must take the same input shape.
+"""
+
+import numpy as np
+
+from .memory import DEFAULT_DTYPE
+from .models import head_name
+
+
+def inverse_mse_weights(errors):
+    """Weights proportional to ``1 / MSE`` from ``{name: validation MSE}``."""
+    return {name: 1.0 / max(float(mse), 1e-12) for name, mse in errors.items()}
+
+
+def _member_output(out, horizon, n_horizons, name):
+    # the member's forecast for ``horizon`` as a symbolic (N, 1) tensor
+    if isinstance(out, dict):
+        key = head_name(horizon)
+        if key not in out:
+            raise ValueError(f"member {name!r} has no head {key!r}")
+        return out[key]
+    if len(out.shape) == 3:
+        if horizon > out.shape[1]:
+            raise ValueError(f"member {name!r} forecasts {out.shape[1]} steps, "
+                             f"not {horizon}")
+        return out[:, horizon - 1, :]
+    if n_horizons > 1:
+        raise ValueError(f"single-output member {name!r} is ambiguous with several "
+                         "horizons; pass {horizon: model}")
+    return out
+
+
+class Ensemble:
+    """Weighted-average ensemble of trained models served by one graph call."""
+
+    def __init__(self, members, horizons=(1,), weights=None):
+        from tensorflow.keras.layers import Concatenate, Dense, Input
+        from tensorflow.keras.models import Model
+
+        self.names = list(members)
+        self.horizons = tuple(horizons)
+        shapes = {tuple(net.input_shape[1:]) for m in members.values()
+                  for net in (m.values() if isinstance(m, dict) else [m])}
+        if len(shapes) != 1:
+            raise ValueError(f"members take different input shapes: {sorted(shapes)}")
+        self.input_shape = shapes.pop()
+
+        inputs = Input(shape=self.input_shape)
+        outputs, combined = {}, []
+        for name, member in members.items():
+            # each model is called once; its heads/steps are shared by the horizons
+            if isinstance(member, dict):
+                calls = {h: member[h](inputs) for h in self.horizons}
+            else:
+                call = member(inputs)
+                calls = {h: call for h in self.horizons}
+            per_call = 1 if isinstance(member, dict) else len(self.horizons)
+            for h in self.horizons:
+                outputs[f'{name}_{head_name(h)}'] = _member_output(calls[h], h, per_call, name)
+        for h in self.horizons:
+            stacked = Concatenate()([outputs[f'{n}_{head_name(h)}'] for n in self.names])
+            combiner = Dense(1, use_bias=False, trainable=False,
+                             name=f'ensemble_{head_name(h)}')
+            outputs[f'ensemble_{head_name(h)}'] = combiner(stacked)
+            combined.append(combiner)
+        self.model = Model(inputs, outputs)
+        self._combiners = dict(zip(self.horizons, combined))
+        self.set_weights(weights)
+        self._fn = None
+
+    def set_weights(self, weights=None, horizon=None):
+        """Set member weights (``{name: w}``, missing names get 1), normalised to sum 1.
+
+        Applies to every horizon, or only ``horizon``. No retracing is needed.
+        """
+        weights = weights or {}
+        unknown = set(weights) - set(self.names)
+        if unknown:
+            raise KeyError(f"unknown members {sorted(unknown)}")
+        w = np.array([float(weights.get(n, 1.0)) for n in self.names])
+        if w.sum() <= 0:
+            raise ValueError("weights must sum to a positive value")
+        kernel = (w / w.sum()).reshape(-1, 1).astype(DEFAULT_DTYPE)
+        for h in ([horizon] if horizon is not None else self.horizons):
+            self._combiners[h].set_weights([kernel])
+
+    def weights(self, horizon=None):
+        h = self.horizons[0] if horizon is None else horizon
+        kernel = self._combiners[h].get_weights()[0].ravel()
+        return dict(zip(self.names, kernel.tolist()))
+
+    def _call(self, X):
+        if self._fn is None:
+            import tensorflow as tf
+
+            spec = tf.TensorSpec((None, *self.input_shape), tf.float32)
+            self._fn = tf.function(lambda x: self.model(x, training=False),
+                                   input_signature=[spec])
+        return self._fn(X)
+
+    def predict(self, X, batch_size=4096, inverse_transform=None):
+        """Every member's and the ensemble's forecast, ``{horizon: {name: (N,)}}``.
+
+        Each chunk of ``batch_size`` windows is one graph call. The
+        ensemble's forecast is under ``'ensemble'``.
+        """
+        X = np.asarray(X, dtype=DEFAULT_DTYPE)
+        parts = []
+        for start in range(0, len(X), batch_size):
+            out = self._call(X[start:start + batch_size])
+            parts.append({k: np.asarray(v).ravel() for k, v in out.items()})
+        keys = list(parts[0]) if parts else []
+        flat = {k: np.concatenate([p[k] for p in parts]) for k in keys}
+        result = {}
+        for h in self.horizons:
+            suffix = f'_{head_name(h)}'
+            result[h] = {k[:-len(suffix)]: flat[k] for k in keys if k.endswith(suffix)}
+            if inverse_transform is not None:
+                result[h] = {k: inverse_transform(v) for k, v in result[h].items()}
+        return result
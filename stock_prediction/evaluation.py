@@ -0,0 +1,186 @@
+"""Vectorised multi-model, multi-horizon scoring with block-bootstrap intervals.
+
+Predictions for every (model, horizon) pair are stacked into one
+``(models, horizons, samples)`` array (NaN-padded, since longer horizons
+have fewer test samples) and inverse-scaled in a single operation. Each
+metric is the mean of a per-sample loss, so a bootstrap resample is just a
+weighting of the samples. With the resample counts in a ``(n_boot,
+samples)`` matrix, every resample of every model comes from one matrix
+product per horizon, and thousands of resamples take milliseconds.
+
+Resampling uses the moving-block (circular) bootstrap, so the serial
+correlation of forecast errors (overlapping h-step targets) is kept inside
+each block. All models are scored on the same resamples, which makes
+paired comparisons against a ``baseline`` model meaningful::
+
+    table = evaluate(y_true, {'SimpleRNN': {1: p1, 5: p5}, 'LSTM': {1: q1, 5: q5}},
+                     scaler=scaler, baseline='SimpleRNN')
+"""
+
+import numpy as np
+import pandas as pd
+
+from .inference import scaler_params
+
+METRICS = ('MSE', 'RMSE', 'MAE', 'MAPE', 'DA')
+
+
+def _as_horizon_dict(values, horizons):
+    if isinstance(values, dict):
+        missing = [h for h in horizons if h not in values]
+        if missing:
+            raise KeyError(f"no values for horizons {missing}")
+        return {h: np.asarray(values[h], dtype=np.float64).ravel() for h in horizons}
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        values = values[None]
+    if len(values) != len(horizons):
+        raise ValueError(f"{len(values)} rows of values for {len(horizons)} horizons")
+    return dict(zip(horizons, values))
+
+
+def stack(series, horizons, length):
+    """``{horizon: (n_h,)}`` as one ``(H, length)`` array padded with NaN."""
+    out = np.full((len(horizons), length), np.nan)
+    for j, h in enumerate(horizons):
+        out[j, :len(series[h])] = series[h]
+    return out
+
+
+def inverse_scale(values, scaler=None, target_col=0):
+    """Map scaled target values (any shape) back to prices in one operation."""
+    values = np.asarray(values, dtype=np.float64)
+    if scaler is None:
+        return values
+    scale, offset = scaler_params(scaler)
+    return (values - offset[target_col]) / scale[target_col]
+
+
+def block_bootstrap_counts(n, n_boot=1000, block=None, seed=0):
+    """How often each of ``n`` samples appears in each circular block resample.
+
+    Returns an ``(n_boot, n)`` array. Blocks of ``block`` consecutive
+    samples (default ``n ** (1/3)``) start at uniformly random positions
+    and wrap around the end.
+    """
+    rng = np.random.default_rng(seed)
+    block = max(1, min(n, block or round(n ** (1 / 3))))
+    n_blocks = -(-n // block)
+    starts = rng.integers(0, n, (n_boot, n_blocks))
+    idx = ((starts[:, :, None] + np.arange(block)) % n).reshape(n_boot, -1)[:, :n]
+    flat = idx + n * np.arange(n_boot)[:, None]
+    return np.bincount(flat.ravel(), minlength=n_boot * n).reshape(n_boot, n)
+
+
+def point_losses(pred, true, origin=None):
+    """Per-sample losses behind each metric, NaN where undefined.
+
+    ``origin`` is the last known price when each forecast was made. It
+    defines the direction of the move for directional accuracy.
+    """
+    err = pred - true
+    with np.errstate(divide='ignore', invalid='ignore'):
+        losses = {'MSE': err ** 2, 'MAE': np.abs(err),
+                  'MAPE': np.abs(err / true) * 100}
+    if origin is not None:
+        hit = np.sign(pred - origin) == np.sign(true - origin)
+        losses['DA'] = np.where(np.isnan(pred) | np.isnan(true) | np.isnan(origin),
+                                np.nan, hit.astype(np.float64))
+    return losses
+
+
+def evaluate(y_true, predictions, scaler=None, target_col=0, origin=None,
+             n_boot=1000, block=None, ci=0.95, baseline=None, seed=0, horizons=None):
+    """Score every model at every horizon, with bootstrap confidence intervals.
+
+    ``y_true`` maps horizon to the test targets, and ``predictions`` maps
+    model name to the same layout. ``horizons`` selects and orders the
+    horizons, by default the keys of the first model's dict. Either may
+    instead be an ``(H, N)`` array, whose rows are then taken to be the
+    ``horizons``, which must be given. Values are in scaled units when ``scaler`` is given,
+    else prices. ``origin`` gives each sample's last known price per
+    horizon. It defaults to the target ``horizon`` samples earlier, which
+    is exact for consecutive windows but drops the first ``horizon``
+    samples from directional accuracy.
+
+    Returns a DataFrame indexed by (model, horizon) with MSE, RMSE, MAE,
+    MAPE (%) and DA (fraction of correctly predicted directions), each with
+    ``_lo``/``_hi`` interval bounds. With ``baseline`` set, ``dMSE`` (model
+    minus baseline) has its own interval, and ``p_better`` gives the share
+    of resamples in which the model's MSE beats the baseline's. The block
+    length defaults to ``max(horizon, n ** (1/3))``.
+    """
+    models = list(predictions)
+    if horizons is None:
+        first = predictions[models[0]]
+        if not isinstance(first, dict):
+            raise ValueError("pass horizons= to say which horizon each row of an "
+                             "array is for")
+        horizons = sorted(first)
+    horizons = list(horizons)
+    truth = _as_horizon_dict(y_true, horizons)
+    preds = {m: _as_horizon_dict(predictions[m], horizons) for m in models}
+    length = max(len(truth[h]) for h in horizons)
+
+    # one stacked inverse transform for every model, horizon and sample
+    Y = inverse_scale(stack(truth, horizons, length), scaler, target_col)
+    P = inverse_scale(np.stack([stack(preds[m], horizons, length) for m in models]),
+                      scaler, target_col)
+    if origin is None:
+        # sample t's origin bar is the target of sample t - horizon
+        O = np.full_like(Y, np.nan)
+        for j, h in enumerate(horizons):
+            O[j, h:len(truth[h])] = Y[j, :len(truth[h]) - h]
+    else:
+        O = inverse_scale(stack(_as_horizon_dict(origin, horizons), horizons, length),
+                          scaler, target_col)
+    if baseline is not None and baseline not in models:
+        raise KeyError(f"baseline {baseline!r} not among {models}")
+
+    q = [(1 - ci) / 2 * 100, (1 + ci) / 2 * 100]
+    rows = []
+    for j, h in enumerate(horizons):
+        n = len(truth[h])
+        losses = point_losses(P[:, j, :n], Y[j, :n], O[j, :n])
+        counts = block_bootstrap_counts(n, n_boot, block or max(h, round(n ** (1 / 3))),
+                                        seed + j).astype(np.float64).T
+        point, boot = {}, {}
+        for name, loss in losses.items():
+            valid = ~np.isnan(loss)
+            filled = np.where(valid, loss, 0.0)
+            point[name] = filled.sum(axis=1) / np.maximum(valid.sum(axis=1), 1)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                boot[name] = (filled @ counts) / (valid.astype(np.float64) @ counts)
+        point['RMSE'], boot['RMSE'] = np.sqrt(point['MSE']), np.sqrt(boot['MSE'])
+
+        for i, model in enumerate(models):
+            row = {'model': model, 'horizon': h, 'n': n}
+            for name in METRICS:
+                if name not in point:
+                    continue
+                row[name] = point[name][i]
+                row[f'{name}_lo'], row[f'{name}_hi'] = np.nanpercentile(boot[name][i], q)
+            if baseline is not None:
+                b = models.index(baseline)
+                diff = boot['MSE'][i] - boot['MSE'][b]
+                row['dMSE'] = point['MSE'][i] - point['MSE'][b]
+                row['dMSE_lo'], row['dMSE_hi'] = np.nanpercentile(diff, q)
+                row['p_better'] = float(np.mean(diff < 0)) if i != b else np.nan
+            rows.append(row)
+    return pd.DataFrame(rows).set_index(['model', 'horizon'])
+
+
+def evaluate_results(results, baseline=None, **kwargs):
+    """:func:`evaluate` on the per-horizon ``results`` dict of ``final_project.py``.
+
+    ``results[h]`` holds ``'y_test'`` and one ``'<model>_pred'`` entry per
+    model, all in price units, e.g. as returned by
+    :func:`~stock_prediction.models.multi_horizon_results`.
+    """
+    y_true = {h: r['y_test'] for h, r in results.items()}
+    predictions = {}
+    for h, r in results.items():
+        for key, value in r.items():
+            if key.endswith('_pred'):
+                predictions.setdefault(key[:-len('_pred')], {})[h] = value
+    return evaluate(y_true, predictions, baseline=baseline, **kwargs)
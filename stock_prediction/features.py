@@ -0,0 +1,259 @@
+"""Technical features computed from the 'Adj Close' price."""
+
+import math
+
+import numpy as np
+
+DEFAULT_FEATURES = ('MA10', 'MA50', 'Returns', 'RSI')
+
+
+def compute_RSI(series, window=14):
+    delta = series.diff()
+    gain = delta.clip(lower=0)
+    loss = -delta.clip(upper=0)
+    avg_gain = gain.rolling(window).mean()
+    avg_loss = loss.rolling(window).mean()
+    rs = avg_gain / avg_loss
+    return 100 - (100 / (1 + rs))
+
+
+def add_features(df, features=DEFAULT_FEATURES, price_col='Adj Close',
+                 rsi_window=14):
+    """Return a copy of ``df`` with the requested feature columns appended.
+
+    ``features`` may contain ``'MA<n>'`` (n-day moving average),
+    ``'Returns'`` (daily percent change) and ``'RSI'``. Warm-up rows are
+    left as NaN; callers drop them once all features are added.
+    """
+    df = df.copy()
+    price = df[price_col]
+    for name in features:
+        if name.startswith('MA') and name[2:].isdigit():
+            df[name] = price.rolling(window=int(name[2:])).mean()
+        elif name == 'Returns':
+            df[name] = price.pct_change()
+        elif name == 'RSI':
+            df[name] = compute_RSI(price, rsi_window)
+        else:
+            raise ValueError(f"unknown feature {name!r}")
+    return df
+
+
+class RollingMean:
+    """O(1)-per-value moving average matching ``Series.rolling(n).mean()``.
+
+    Mirrors pandas' ``roll_mean`` kernel (Kahan-compensated running sum with
+    separate add/remove compensation and its sign/repeat corrections), so
+    feeding a series value by value gives bit-identical results to the batch
+    computation over the same history.
+    """
+
+    def __init__(self, window):
+        if window < 1:
+            raise ValueError("window must be >= 1")
+        self.window = window
+        self._buf = [math.nan] * window
+        self._count = 0
+        self._reset()
+
+    def _reset(self):
+        self.nobs = 0
+        self.neg_ct = 0
+        self.sum_x = 0.0
+        self.comp_add = 0.0
+        self.comp_remove = 0.0
+        self.same_ct = 0
+        self.prev_value = math.nan
+
+    def _add(self, val):
+        if val != val:
+            return
+        self.nobs += 1
+        y = val - self.comp_add
+        t = self.sum_x + y
+        self.comp_add = t - self.sum_x - y
+        self.sum_x = t
+        if math.copysign(1.0, val) < 0:
+            self.neg_ct += 1
+        if val == self.prev_value:
+            self.same_ct += 1
+        else:
+            self.same_ct = 1
+        self.prev_value = val
+
+    def _remove(self, val):
+        if val != val:
+            return
+        self.nobs -= 1
+        y = -val - self.comp_remove
+        t = self.sum_x + y
+        self.comp_remove = t - self.sum_x - y
+        self.sum_x = t
+        if math.copysign(1.0, val) < 0:
+            self.neg_ct -= 1
+
+    def update(self, val):
+        val = float(val)
+        slot = self._count % self.window
+        if self._count == 0 or self.window == 1:
+            # pandas re-initialises its state whenever the window does not
+            # overlap the previous one (first value, or window of 1)
+            self._reset()
+            self.prev_value = val
+        elif self._count >= self.window:
+            self._remove(self._buf[slot])
+        self._buf[slot] = val
+        self._add(val)
+        self._count += 1
+        return self.value
+
+    @property
+    def value(self):
+        if self.nobs < self.window or self.nobs == 0:
+            return math.nan
+        result = self.sum_x / self.nobs
+        if self.same_ct >= self.nobs:
+            result = self.prev_value
+        elif self.neg_ct == 0 and result < 0:
+            result = 0.0
+        elif self.neg_ct == self.nobs and result > 0:
+            result = 0.0
+        return result
+
+
+class FeatureEngine:
+    """Stateful, constant-time-per-bar version of :func:`add_features`.
+
+    Call :meth:`update` with each new price; it returns the feature row for
+    that bar (NaN during warm-up). Replaying the full history reproduces the
+    batch pandas columns exactly, so seed it with :meth:`from_history`
+    before streaming new bars.
+    """
+
+    def __init__(self, features=DEFAULT_FEATURES, price_col='Adj Close',
+                 rsi_window=14):
+        self.features = tuple(features)
+        self.price_col = price_col
+        self._ma = {}
+        for name in self.features:
+            if name.startswith('MA') and name[2:].isdigit():
+                self._ma[name] = RollingMean(int(name[2:]))
+            elif name not in ('Returns', 'RSI'):
+                raise ValueError(f"unknown feature {name!r}")
+        self._gain = RollingMean(rsi_window)
+        self._loss = RollingMean(rsi_window)
+        self._last = math.nan
+        self.n_bars = 0
+
+    @classmethod
+    def from_history(cls, prices, **kwargs):
+        engine = cls(**kwargs)
+        for price in prices:
+            engine.update(price)
+        return engine
+
+    def update(self, price):
+        price = float(price)
+        delta = price - self._last
+        row = {self.price_col: price}
+        for name in self.features:
+            if name in self._ma:
+                row[name] = self._ma[name].update(price)
+            elif name == 'Returns':
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    row[name] = float(np.float64(price) / self._last - 1)
+            elif name == 'RSI':
+                row[name] = self._rsi(delta)
+        self._last = price
+        self.n_bars += 1
+        return row
+
+    def _rsi(self, delta):
+        if delta != delta:
+            gain = loss = math.nan
+        else:
+            # same signed zeros as delta.clip(lower=0) and -delta.clip(upper=0)
+            gain = delta if delta > 0 else 0.0
+            loss = -(delta if delta < 0 else 0.0)
+        avg_gain = np.float64(self._gain.update(gain))
+        avg_loss = np.float64(self._loss.update(loss))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rs = avg_gain / avg_loss
+            return float(100 - (100 / (1 + rs)))
+
+
+def _panel_rolling_mean(x, window):
+    """Column-wise trailing mean that is NaN unless all ``window`` values exist.
+
+    Same semantics as ``DataFrame.rolling(window).mean()``, computed from
+    running sums in one pass. Each column is centred on its own mean first
+    to keep the cumulative-sum cancellation error small. Exact counts of the
+    non-zero and negative values in each window make an all-zero window
+    exactly 0 and keep a window without negatives from going below 0, as
+    pandas does, so e.g. the gains of a flat price stretch average to 0
+    rather than to rounding noise.
+    """
+    valid = ~np.isnan(x)
+    filled = np.where(valid, x, 0.0)
+    ref = filled.sum(axis=0) / np.maximum(valid.sum(axis=0), 1)
+    dev = np.where(valid, filled - ref, 0.0)
+
+    def window_counts(flags):
+        counts = np.zeros((len(x) + 1,) + x.shape[1:], dtype=np.int64)
+        np.cumsum(flags, axis=0, out=counts[1:])
+        return counts[window:] - counts[:-window]
+
+    total = np.zeros((len(x) + 1,) + x.shape[1:])
+    np.cumsum(dev, axis=0, out=total[1:])
+
+    out = np.full(x.shape, np.nan)
+    if len(x) >= window:
+        mean = (total[window:] - total[:-window]) / window + ref
+        mean = np.where(window_counts(filled != 0) == 0, 0.0, mean)
+        mean = np.where(window_counts(filled < 0) == 0, np.maximum(mean, 0.0), mean)
+        out[window - 1:] = np.where(window_counts(valid) == window, mean, np.nan)
+    return out
+
+
+def panel_features(prices, features=DEFAULT_FEATURES, rsi_window=14):
+    """Compute features for many tickers at once.
+
+    ``prices`` is a 2-D (time x ticker) array or DataFrame, NaN where a
+    ticker has no bar (ragged listing/delisting dates, gaps). Returns a
+    dict mapping each feature name to an array of the same shape (or a
+    DataFrame with the same index/columns). Windows that touch a missing
+    bar are NaN, like the per-ticker pandas computation, and the values
+    agree with it to floating-point rounding, including over flat
+    (halted) stretches, where RSI is NaN.
+    """
+    frame = prices if hasattr(prices, 'columns') else None
+    x = np.asarray(prices, dtype=np.float64)
+    if x.ndim != 2:
+        raise ValueError(f"prices must be 2-D (time x ticker), got shape {x.shape}")
+    dtype = np.result_type(np.asarray(prices).dtype, np.float32)
+
+    delta = np.full(x.shape, np.nan)
+    delta[1:] = x[1:] - x[:-1]
+
+    out = {}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for name in features:
+            if name.startswith('MA') and name[2:].isdigit():
+                out[name] = _panel_rolling_mean(x, int(name[2:]))
+            elif name == 'Returns':
+                ret = np.full(x.shape, np.nan)
+                ret[1:] = x[1:] / x[:-1] - 1
+                out[name] = ret
+            elif name == 'RSI':
+                gain = np.where(np.isnan(delta), np.nan, np.maximum(delta, 0.0))
+                loss = np.where(np.isnan(delta), np.nan, -np.minimum(delta, 0.0))
+                rs = _panel_rolling_mean(gain, rsi_window) / _panel_rolling_mean(loss, rsi_window)
+                out[name] = 100 - (100 / (1 + rs))
+            else:
+                raise ValueError(f"unknown feature {name!r}")
+
+    out = {name: values.astype(dtype, copy=False) for name, values in out.items()}
+    if frame is not None:
+        out = {name: type(frame)(values, index=frame.index, columns=frame.columns)
+               for name, values in out.items()}
+    return out
@@ -0,0 +1,298 @@
+"""TensorFlow-free inference for exported recurrent models.
+
+:func:`export_model` writes a trained Keras model's weights, a description
+of its layers and the fitted scaler to one ``.npz`` file. :class:`NumpyModel`
+loads that file and runs the forward pass with NumPy alone. It gives the
+same outputs as ``model.predict`` (within float32 round-off) without
+importing TensorFlow::
+
+    export_model(net, prepared.scaler, 'lstm_h5.npz', horizon=5)
+
+    engine = NumpyModel.load('lstm_h5.npz')
+    prices = engine.forecast(raw_windows)   # (N, window, features) in price units
+
+Supported layers: ``SimpleRNN``, ``LSTM``, ``Bidirectional`` over either,
+``Dense``, ``TimeDistributed(Dense)``, ``RepeatVector`` and ``Dropout`` (a
+no-op at inference). Models are a single chain of layers ending in one or
+more output heads, which covers every builder in :mod:`~stock_prediction.models`.
+"""
+
+import json
+
+import numpy as np
+
+FORMAT_VERSION = 1
+
+
+def _sigmoid(x):
+    # tanh form avoids overflow in exp for large negative inputs
+    return 0.5 * (1.0 + np.tanh(0.5 * x))
+
+
+def _hard_sigmoid(x):
+    return np.clip(x / 6.0 + 0.5, 0.0, 1.0)
+
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'tanh': np.tanh,
+    'sigmoid': _sigmoid,
+    'hard_sigmoid': _hard_sigmoid,
+    'relu': lambda x: np.maximum(x, 0),
+}
+
+
+def _activation(name):
+    try:
+        return ACTIVATIONS[name]
+    except KeyError:
+        raise ValueError(f"unsupported activation {name!r}") from None
+
+
+# ----------------------------------------------------------------- export ---
+
+def _layer_spec(layer):
+    """``(spec, weights)`` for one Keras layer, or ``None`` to skip it."""
+    kind = type(layer).__name__
+    config = layer.get_config()
+    if kind in ('InputLayer', 'Dropout'):
+        return None
+    if kind == 'TimeDistributed':
+        # Dense already maps over the time axis of a 3-D input
+        if type(layer.layer).__name__ != 'Dense':
+            raise ValueError(f"unsupported TimeDistributed({type(layer.layer).__name__})")
+        return _layer_spec(layer.layer)
+    if kind == 'Dense':
+        spec = {'type': 'Dense', 'activation': config['activation']}
+    elif kind in ('SimpleRNN', 'LSTM'):
+        spec = {'type': kind, 'units': config['units'], 'activation': config['activation'],
+                'return_sequences': config['return_sequences'],
+                'go_backwards': config['go_backwards']}
+        if kind == 'LSTM':
+            spec['recurrent_activation'] = config['recurrent_activation']
+    elif kind == 'Bidirectional':
+        if layer.merge_mode not in ('concat', 'sum', 'ave', 'mul'):
+            raise ValueError(f"unsupported merge_mode {layer.merge_mode!r}")
+        forward, fw = _layer_spec(layer.forward_layer)
+        backward, bw = _layer_spec(layer.backward_layer)
+        spec = {'type': kind, 'merge_mode': layer.merge_mode,
+                'forward': forward, 'backward': backward, 'n_forward': len(fw)}
+        return spec, fw + bw
+    elif kind == 'RepeatVector':
+        spec = {'type': kind, 'n': config['n']}
+    else:
+        raise ValueError(f"unsupported layer type {kind}")
+    weights = layer.get_weights()
+    spec['use_bias'] = len(weights) > (1 if kind == 'Dense' else 2)
+    return spec, weights
+
+
+def scaler_params(scaler):
+    """``(scale, offset)`` with ``scaled = raw * scale + offset``.
+
+    Works for fitted ``MinMaxScaler`` and ``StandardScaler``.
+    """
+    if hasattr(scaler, 'min_'):
+        return np.asarray(scaler.scale_), np.asarray(scaler.min_)
+    if hasattr(scaler, 'mean_'):
+        scale = 1.0 / np.asarray(scaler.scale_)
+        return scale, -np.asarray(scaler.mean_) * scale
+    raise ValueError(f"unsupported scaler {type(scaler).__name__}")
+
+
+def export_model(net, scaler, path, target_col=0, **meta):
+    """Write ``net`` and ``scaler`` to ``path`` for :class:`NumpyModel`.
+
+    ``meta`` (e.g. horizon, features, window size) is stored alongside the
+    weights and returned by ``NumpyModel.meta``. The export is checked
+    against ``net.predict`` on a small probe batch before it is written.
+    """
+    # Sequential models have no output_names; their output is the last layer
+    outputs = list(getattr(net, 'output_names', None) or [net.layers[-1].name])
+    trunk, heads, arrays = [], [], {}
+    for layer in net.layers:
+        entry = _layer_spec(layer)
+        if entry is None:
+            continue
+        spec, weights = entry
+        index = len(trunk) + len(heads)
+        spec.update(name=layer.name, index=index, n_weights=len(weights))
+        for j, w in enumerate(weights):
+            arrays[f'w{index}_{j}'] = np.asarray(w)
+        (heads if layer.name in outputs else trunk).append(spec)
+    if len(heads) != len(outputs):
+        raise ValueError("model outputs must be the last layer(s) of a single chain")
+
+    input_shape = tuple(net.input_shape[1:])
+    probe = np.random.default_rng(0).random((4,) + input_shape).astype(np.float32)
+    expected = net.predict(probe, verbose=0)
+    spec = {'format': FORMAT_VERSION, 'trunk': trunk, 'heads': heads,
+            'multi_output': isinstance(expected, dict), 'target_col': target_col,
+            'input_shape': list(input_shape), 'meta': meta}
+    if scaler is not None:
+        arrays['scaler_scale'], arrays['scaler_offset'] = scaler_params(scaler)
+
+    # refuse to write an export that does not reproduce the Keras model
+    got = NumpyModel(json.loads(json.dumps(spec)), arrays).predict(probe)
+    if not isinstance(expected, dict):
+        expected, got = {'': expected}, {'': got}
+    for name, value in expected.items():
+        if not np.allclose(got[name], value, rtol=1e-3, atol=1e-4):
+            raise ValueError(f"NumPy forward pass differs from the Keras model "
+                             f"(max abs error {np.abs(got[name] - value).max():.3g})")
+    np.savez(path, spec=np.array(json.dumps(spec)), **arrays)
+    return path
+
+
+# -------------------------------------------------------------- recurrent ---
+
+def _simple_rnn(x, spec, weights, state=None):
+    kernel, recurrent = weights[0], weights[1]
+    bias = weights[2] if spec['use_bias'] else 0
+    act = _activation(spec['activation'])
+    n, steps, _ = x.shape
+    h = np.zeros((n, recurrent.shape[0]), x.dtype) if state is None else state[0]
+    proj = x @ kernel + bias
+    seq = np.empty((n, steps, h.shape[1]), x.dtype) if spec['return_sequences'] else None
+    order = range(steps - 1, -1, -1) if spec['go_backwards'] else range(steps)
+    for i, t in enumerate(order):
+        h = act(proj[:, t] + h @ recurrent)
+        if seq is not None:
+            seq[:, i] = h
+    return (h if seq is None else seq), (h,)
+
+
+def _lstm(x, spec, weights, state=None):
+    kernel, recurrent = weights[0], weights[1]
+    bias = weights[2] if spec['use_bias'] else 0
+    act = _activation(spec['activation'])
+    gate = _activation(spec['recurrent_activation'])
+    n, steps, _ = x.shape
+    units = recurrent.shape[0]
+    if state is None:
+        h = np.zeros((n, units), x.dtype)
+        c = np.zeros((n, units), x.dtype)
+    else:
+        h, c = state
+    # input projection for every step in one matmul; only h @ recurrent is sequential
+    proj = x @ kernel + bias
+    seq = np.empty((n, steps, units), x.dtype) if spec['return_sequences'] else None
+    order = range(steps - 1, -1, -1) if spec['go_backwards'] else range(steps)
+    for i, t in enumerate(order):
+        z = proj[:, t] + h @ recurrent
+        # Keras gate order: input, forget, cell, output
+        c = gate(z[:, units:2 * units]) * c + gate(z[:, :units]) * act(z[:, 2 * units:3 * units])
+        h = gate(z[:, 3 * units:]) * act(c)
+        if seq is not None:
+            seq[:, i] = h
+    return (h if seq is None else seq), (h, c)
+
+
+RECURRENT = {'SimpleRNN': _simple_rnn, 'LSTM': _lstm}
+
+
+def _bidirectional(x, spec, weights):
+    split = spec['n_forward']
+    forward, _ = RECURRENT[spec['forward']['type']](x, spec['forward'], weights[:split])
+    backward, _ = RECURRENT[spec['backward']['type']](x, spec['backward'], weights[split:])
+    if spec['backward']['return_sequences']:
+        backward = backward[:, ::-1]
+    mode = spec['merge_mode']
+    if mode == 'concat':
+        return np.concatenate([forward, backward], axis=-1)
+    if mode == 'sum':
+        return forward + backward
+    if mode == 'ave':
+        return (forward + backward) / 2
+    return forward * backward
+
+
+def _apply(x, spec, weights):
+    kind = spec['type']
+    if kind in RECURRENT:
+        return RECURRENT[kind](x, spec, weights)[0]
+    if kind == 'Bidirectional':
+        return _bidirectional(x, spec, weights)
+    if kind == 'Dense':
+        out = x @ weights[0]
+        if spec['use_bias']:
+            out = out + weights[1]
+        return _activation(spec['activation'])(out)
+    if kind == 'RepeatVector':
+        return np.repeat(x[:, None], spec['n'], axis=1)
+    raise ValueError(f"unsupported layer type {kind}")
+
+
+class NumpyModel:
+    """Forward pass of an exported model using NumPy only."""
+
+    def __init__(self, spec, arrays):
+        if spec.get('format') != FORMAT_VERSION:
+            raise ValueError(f"unsupported export format {spec.get('format')!r}")
+        self.spec = spec
+        self.meta = spec['meta']
+        self.target_col = spec['target_col']
+        self.input_shape = tuple(spec['input_shape'])
+        self.scale = arrays.get('scaler_scale')
+        self.offset = arrays.get('scaler_offset')
+
+        def weights(layer):
+            return [arrays[f"w{layer['index']}_{j}"] for j in range(layer['n_weights'])]
+
+        self.trunk = [(layer, weights(layer)) for layer in spec['trunk']]
+        self.heads = [(layer, weights(layer)) for layer in spec['heads']]
+        self.dtype = next((w[0].dtype for _, w in self.trunk + self.heads if w), np.float32)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {k: data[k] for k in data.files}
+        return cls(json.loads(str(arrays.pop('spec'))), arrays)
+
+    def _forward(self, x, start=0):
+        # ``start`` skips trunk layers the caller has already applied
+        for layer, weights in self.trunk[start:]:
+            x = _apply(x, layer, weights)
+        outputs = {layer['name']: _apply(x, layer, weights) for layer, weights in self.heads}
+        if self.spec['multi_output']:
+            return outputs
+        return next(iter(outputs.values()))
+
+    def predict(self, X, batch_size=4096):
+        """Model output for scaled windows ``X`` of shape (N, window, features).
+
+        Mirrors ``model.predict``: an array, or a dict of arrays per head for
+        multi-output models. Rows are processed in batches of ``batch_size``.
+        """
+        X = np.asarray(X, dtype=self.dtype)
+        if X.ndim == 2:
+            X = X[None]
+        if X.shape[1:] != self.input_shape:
+            raise ValueError(f"expected windows of shape {self.input_shape}, "
+                             f"got {X.shape[1:]}")
+        if len(X) <= batch_size:
+            return self._forward(X)
+        parts = [self._forward(X[i:i + batch_size]) for i in range(0, len(X), batch_size)]
+        if isinstance(parts[0], dict):
+            return {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+        return np.concatenate(parts)
+
+    def transform(self, raw):
+        """Scale raw feature rows the way the training scaler did."""
+        if self.scale is None:
+            raise ValueError("no scaler was exported with this model")
+        return np.asarray(raw, dtype=np.float64) * self.scale + self.offset
+
+    def inverse_target(self, values):
+        """Map scaled target-column values back to prices."""
+        if self.scale is None:
+            raise ValueError("no scaler was exported with this model")
+        col = self.target_col
+        return (np.asarray(values, dtype=np.float64) - self.offset[col]) / self.scale[col]
+
+    def forecast(self, raw_windows, batch_size=4096):
+        """Price forecasts for unscaled windows (N, window, features)."""
+        pred = self.predict(self.transform(raw_windows), batch_size)
+        if isinstance(pred, dict):
+            return {k: self.inverse_target(v) for k, v in pred.items()}
+        return self.inverse_target(pred)
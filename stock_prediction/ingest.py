@@ -0,0 +1,193 @@
+"""Parallel, chunked ingest of many price CSVs into one binary dataset.
+
+Each file is read with only the needed columns, explicit float dtypes and
+the fastest available parser (pyarrow when installed, else pandas' C
+engine). Files larger than ``chunk_bytes`` are read ``chunksize`` rows at a
+time so memory stays bounded. Rows are cleaned as in
+:func:`~stock_prediction.data.clean_prices`, with forward fill carried across
+chunk boundaries. Files are processed concurrently on a thread pool, since
+the parsers release the GIL. The result is one directory::
+
+    values.npy   (rows, columns) float32, every ticker back to back
+    index.npy    (rows,) datetime64 bar timestamps
+    meta.json    columns, and each ticker's [start, stop) row range
+
+which :func:`open_dataset` memory-maps::
+
+    ingest(glob.glob('prices/*.csv'), 'dataset')
+    ds = open_dataset('dataset')
+    ds.frame('AAPL')              # one ticker, DataFrame view on the memmap
+    ds.panel('Adj Close')         # date x ticker, for panel_features
+"""
+
+import json
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .memory import DEFAULT_DTYPE
+
+try:
+    import pyarrow  # noqa: F401
+    FAST_ENGINE = 'pyarrow'
+except ImportError:
+    FAST_ENGINE = 'c'
+
+DATASET_VERSION = 1
+
+
+def ticker_name(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def _read_kwargs(columns, date_col, dtype):
+    return {'usecols': [date_col, *columns], 'dtype': {c: dtype for c in columns},
+            'parse_dates': [date_col], 'index_col': date_col}
+
+
+def iter_price_chunks(path, columns=('Adj Close',), fill='drop', dtype=DEFAULT_DTYPE,
+                      date_col='Date', chunksize=1_000_000, chunk_bytes=256 << 20):
+    """Yield cleaned, date-indexed DataFrames covering ``path`` in order.
+
+    Small files come back as a single frame from the fast engine. Files
+    over ``chunk_bytes`` are read ``chunksize`` rows at a time.
+    """
+    if fill not in ('drop', 'ffill'):
+        raise ValueError(f"fill must be 'drop' or 'ffill', got {fill!r}")
+    kwargs = _read_kwargs(list(columns), date_col, dtype)
+    if os.path.getsize(path) <= chunk_bytes:
+        chunks = [pd.read_csv(path, engine=FAST_ENGINE, **kwargs)]
+    else:
+        # pyarrow cannot read in chunks
+        chunks = pd.read_csv(path, engine='c', chunksize=chunksize, **kwargs)
+
+    last = None
+    for chunk in chunks:
+        chunk = chunk[list(columns)]
+        if fill == 'drop':
+            chunk = chunk.dropna()
+        else:
+            chunk = chunk.ffill()
+            if last is not None:
+                chunk = chunk.fillna(last)
+            last = chunk.iloc[-1] if len(chunk) else last
+        if len(chunk):
+            yield chunk
+
+
+def _ingest_file(path, part_dir, columns, fill, dtype, date_col, chunksize, chunk_bytes):
+    # one worker: write each cleaned chunk to its own part files as it is parsed,
+    # so only one chunk of the file is in memory at a time
+    name = ticker_name(path)
+    parts = []
+    for i, chunk in enumerate(iter_price_chunks(path, columns, fill, dtype, date_col,
+                                                chunksize, chunk_bytes)):
+        part = os.path.join(part_dir, f'{name}.{i:06d}')
+        np.save(f'{part}.values.npy', chunk.to_numpy(dtype=dtype))
+        np.save(f'{part}.index.npy', chunk.index.to_numpy())
+        parts.append((part, len(chunk)))
+    return name, parts
+
+
+def ingest(paths, out_dir, columns=('Adj Close',), fill='drop', dtype=DEFAULT_DTYPE,
+           date_col='Date', max_workers=None, chunksize=1_000_000, chunk_bytes=256 << 20):
+    """Read ``paths`` concurrently and write one consolidated dataset to ``out_dir``.
+
+    Tickers are named after the file stems and stored in ``paths`` order.
+    Each chunk of each file is written to a temporary part as soon as it is
+    parsed, and the parts are then copied into place one at a time, so
+    peak memory is about ``max_workers`` chunks (or small files) rather
+    than the whole collection.
+    Returns the dataset's metadata.
+    """
+    paths = list(paths)
+    names = [ticker_name(p) for p in paths]
+    if len(set(names)) != len(names):
+        raise ValueError("ticker names (file stems) must be unique")
+    dtype = np.dtype(dtype)
+    columns = list(columns)
+
+    parent = os.path.dirname(os.path.abspath(out_dir))
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=parent, prefix='.ingest-')
+    try:
+        parts = os.path.join(tmp, 'parts')
+        os.makedirs(parts)
+        with ThreadPoolExecutor(max_workers) as pool:
+            files = list(pool.map(
+                lambda p: _ingest_file(p, parts, columns, fill, dtype, date_col,
+                                       chunksize, chunk_bytes), paths))
+
+        def part(prefix, kind):
+            return np.load(f'{prefix}.{kind}.npy', mmap_mode='r')
+
+        total = sum(n for _, chunks in files for _, n in chunks)
+        # files (and chunks) may parse to different datetime units; keep the finest
+        index_dtype = np.result_type(*[part(prefix, 'index').dtype
+                                       for _, chunks in files for prefix, _ in chunks]
+                                     or ['datetime64[ns]'])
+        values = np.lib.format.open_memmap(os.path.join(tmp, 'values.npy'), 'w+',
+                                           dtype, (total, len(columns)))
+        index = np.lib.format.open_memmap(os.path.join(tmp, 'index.npy'), 'w+',
+                                          index_dtype, (total,))
+        tickers, start = {}, 0
+        for name, chunks in files:
+            first = start
+            for prefix, n in chunks:
+                values[start:start + n] = part(prefix, 'values')
+                index[start:start + n] = part(prefix, 'index')
+                start += n
+            tickers[name] = [first, start]
+        values.flush()
+        index.flush()
+        del values, index
+        shutil.rmtree(parts)
+
+        meta = {'version': DATASET_VERSION, 'columns': columns, 'dtype': dtype.name,
+                'fill': fill, 'index_name': date_col, 'tickers': tickers}
+        with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+        if os.path.isdir(out_dir):
+            shutil.rmtree(out_dir)
+        os.replace(tmp, out_dir)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return meta
+
+
+class Dataset:
+    """Memory-mapped view of a directory written by :func:`ingest`."""
+
+    def __init__(self, path, mmap=True):
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        mode = 'r' if mmap else None
+        self.values = np.load(os.path.join(path, 'values.npy'), mmap_mode=mode)
+        self.index = np.load(os.path.join(path, 'index.npy'), mmap_mode=mode)
+        self.columns = self.meta['columns']
+        self.tickers = list(self.meta['tickers'])
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def frame(self, ticker):
+        """One ticker's rows as a date-indexed DataFrame (no copy of the values)."""
+        start, stop = self.meta['tickers'][ticker]
+        index = pd.DatetimeIndex(self.index[start:stop], name=self.meta['index_name'])
+        return pd.DataFrame(self.values[start:stop], index=index, columns=self.columns,
+                            copy=False)
+
+    def panel(self, column='Adj Close'):
+        """Date x ticker frame of one column, NaN where a ticker has no bar."""
+        col = self.columns.index(column)
+        series = {t: self.frame(t).iloc[:, col] for t in self.tickers}
+        return pd.concat(series, axis=1, sort=True)
+
+
+def open_dataset(path, mmap=True):
+    return Dataset(path, mmap)
@@ -0,0 +1,162 @@
+"""Per-stage timing and structured run metrics.
+
+``RunMetrics`` writes one JSON object per line. Each ``stage`` record has
+wall-clock seconds, CPU seconds and memory (process max RSS and, with
+``trace_memory=True``, the peak Python/NumPy heap allocation inside the
+stage). Arbitrary result records such as MSE are written with ``log``.
+:func:`keras_callback` adds per-epoch timing and samples/sec from training::
+
+    metrics = RunMetrics('run_metrics.jsonl')
+    with metrics.stage('fit', model='LSTM', horizon=5):
+        model.fit(X, y, callbacks=[keras_callback(metrics, len(X))])
+    metrics.log('result', model='LSTM', horizon=5, MSE=mse)
+"""
+
+import contextlib
+import json
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+STAGES = ('load', 'clean', 'feature', 'scale', 'window', 'fit', 'predict',
+          'inverse_transform', 'evaluate')
+
+
+def max_rss_mb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss / 2**20 if sys.platform == 'darwin' else rss / 2**10
+
+
+class RunMetrics:
+    """JSON-lines sink for stage timings and results of one run.
+
+    ``path`` may be a file path (appended to), an open text stream, or
+    ``None`` to only keep the records in ``self.records``.
+    """
+
+    def __init__(self, path=None, run_id=None, trace_memory=False, **tags):
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.trace_memory = trace_memory
+        self.tags = tags
+        self.records = []
+        self._stream = None
+        self._own_stream = False
+        if isinstance(path, (str, os.PathLike)):
+            self._stream = open(path, 'a')
+            self._own_stream = True
+        elif path is not None:
+            self._stream = path
+
+    def log(self, event, **fields):
+        record = {'ts': time.time(), 'run_id': self.run_id, 'event': event,
+                  **self.tags, **fields}
+        self.records.append(record)
+        if self._stream is not None:
+            self._stream.write(json.dumps(record, default=float) + '\n')
+            self._stream.flush()
+        return record
+
+    @contextlib.contextmanager
+    def stage(self, name, **tags):
+        tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        elif self.trace_memory:
+            tracemalloc.reset_peak()
+        wall, cpu = time.perf_counter(), time.process_time()
+        status = 'ok'
+        try:
+            yield
+        except BaseException:
+            status = 'error'
+            raise
+        finally:
+            fields = {'stage': name, 'status': status,
+                      'wall_s': time.perf_counter() - wall,
+                      'cpu_s': time.process_time() - cpu,
+                      'max_rss_mb': max_rss_mb()}
+            if self.trace_memory:
+                fields['peak_traced_mb'] = tracemalloc.get_traced_memory()[1] / 2**20
+                if tracing:
+                    tracemalloc.stop()
+            self.log('stage', **fields, **tags)
+
+    def summary(self):
+        """Total wall/CPU seconds per stage name."""
+        totals = {}
+        for record in self.records:
+            if record['event'] == 'stage':
+                total = totals.setdefault(record['stage'], {'wall_s': 0.0, 'cpu_s': 0.0,
+                                                            'calls': 0})
+                total['wall_s'] += record['wall_s']
+                total['cpu_s'] += record['cpu_s']
+                total['calls'] += 1
+        return totals
+
+    def close(self):
+        if self._own_stream:
+            self._stream.close()
+        self._stream = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def timed(metrics, name, **tags):
+    """``metrics.stage(name)`` or a no-op context when ``metrics`` is None."""
+    if metrics is None:
+        return contextlib.nullcontext()
+    return metrics.stage(name, **tags)
+
+
+_CALLBACK_CLASS = None
+
+
+def keras_callback(metrics, n_samples=None, **tags):
+    """Keras callback logging one ``epoch`` record per training epoch.
+
+    Records epoch wall time, samples/sec and the epoch's logs (loss,
+    val_loss). ``n_samples`` is the number of training samples. When
+    omitted it is estimated from the step count and batch size.
+    """
+    global _CALLBACK_CLASS
+    if _CALLBACK_CLASS is None:
+        from tensorflow.keras.callbacks import Callback
+
+        class EpochMetrics(Callback):
+            def __init__(self, metrics, n_samples, tags):
+                super().__init__()
+                self.metrics, self.n_samples, self.tags = metrics, n_samples, tags
+
+            def on_epoch_begin(self, epoch, logs=None):
+                self._start = time.perf_counter()
+                self._batches = 0
+
+            def on_train_batch_end(self, batch, logs=None):
+                self._batches += 1
+
+            def on_epoch_end(self, epoch, logs=None):
+                seconds = time.perf_counter() - self._start
+                n = self.n_samples
+                if n is None:
+                    n = self._batches * self.params.get('batch_size', 32)
+                fields = {k: float(v) for k, v in (logs or {}).items()}
+                fields.update(wall_s=seconds,
+                              samples_per_sec=n / seconds if seconds else None)
+                self.metrics.log('epoch', epoch=epoch, **fields, **self.tags)
+
+        _CALLBACK_CLASS = EpochMetrics
+    return _CALLBACK_CLASS(metrics, n_samples, tags)
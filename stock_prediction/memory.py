@@ -0,0 +1,83 @@
+"""Working dtype and memory budget for window arrays.
+
+Prices, features, windows and targets are kept in ``DEFAULT_DTYPE``
+(float32): Keras trains in float32 anyway, so float64 only doubles memory
+and input bandwidth. Features are still computed in float64 and cast once
+at the end.
+
+The memory budget caps the size of any window array the pipeline would
+materialise: ``make_windows(materialize=True)`` and training inputs are
+refused with :class:`MemoryBudgetError` when over budget, and prediction is
+run in chunks that fit. Set it with :func:`set_memory_budget`, the
+``STOCK_PREDICTION_MEMORY_BUDGET`` environment variable (e.g. ``2G``,
+``512M``) or the CLI's ``--memory-budget``. The default is unlimited.
+"""
+
+import os
+import re
+
+import numpy as np
+
+DEFAULT_DTYPE = np.float32
+
+_UNITS = {'': 1, 'K': 2**10, 'M': 2**20, 'G': 2**30, 'T': 2**40}
+_budget = None
+
+
+class MemoryBudgetError(MemoryError):
+    """An array would exceed the configured memory budget."""
+
+
+def parse_size(text):
+    """Bytes in a size such as ``'512M'``, ``'2G'``, ``'1.5GB'`` or ``'1000000'``."""
+    match = re.fullmatch(r'\s*([\d.]+)\s*([KMGT]?)i?B?\s*', str(text), re.IGNORECASE)
+    if match is None:
+        raise ValueError(f"invalid size {text!r}")
+    return int(float(match.group(1)) * _UNITS[match.group(2).upper()])
+
+
+def set_memory_budget(budget):
+    """Set the process-wide budget in bytes (int or size string); ``None`` lifts it."""
+    global _budget
+    _budget = None if budget is None else parse_size(budget)
+
+
+def memory_budget():
+    """The current budget in bytes, or ``None`` for unlimited."""
+    if _budget is not None:
+        return _budget
+    env = os.environ.get('STOCK_PREDICTION_MEMORY_BUDGET')
+    return parse_size(env) if env else None
+
+
+def format_size(nbytes):
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if nbytes < 1024 or unit == 'GiB':
+            return f"{nbytes:.0f} {unit}" if unit == 'B' else f"{nbytes:.1f} {unit}"
+        nbytes /= 1024
+
+
+def windows_nbytes(X):
+    """Bytes ``X`` takes once materialised, even if it is a strided view."""
+    return int(np.prod(X.shape, dtype=np.int64)) * X.dtype.itemsize
+
+
+def check_budget(nbytes, what, budget=None):
+    """Raise :class:`MemoryBudgetError` if ``nbytes`` exceeds the budget."""
+    budget = memory_budget() if budget is None else budget
+    if budget is not None and nbytes > budget:
+        raise MemoryBudgetError(
+            f"{what} would take {format_size(nbytes)}, over the memory budget of "
+            f"{format_size(budget)}; reduce window_size, the feature set or the "
+            f"history length, use float32, or raise the budget")
+
+
+def chunk_rows(X, budget=None):
+    """Rows of ``X`` per chunk so a materialised chunk fits the budget."""
+    budget = memory_budget() if budget is None else budget
+    if budget is None or len(X) == 0:
+        return max(len(X), 1)
+    row = windows_nbytes(X[:1])
+    if row > budget:
+        check_budget(row, "a single window", budget)
+    return max(budget // row, 1)
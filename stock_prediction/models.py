@@ -0,0 +1,151 @@
+"""Model builders and multi-horizon training helpers.
+
+Every builder returns a compiled model. Passing ``horizons`` switches to
+multi-output mode: one shared recurrent encoder with a ``Dense(1)`` head per
+horizon (outputs named ``h1``, ``h5``, ...), so all horizons are trained in
+a single ``fit`` instead of one network per horizon.
+"""
+
+import numpy as np
+from sklearn.metrics import mean_squared_error
+from tensorflow.keras.models import Model
+from tensorflow.keras.optimizers import Adam
+from tensorflow.keras.layers import (Input, Dense, SimpleRNN, LSTM, Dropout, Concatenate,
+                                     Bidirectional, RepeatVector, TimeDistributed)
+
+from .memory import check_budget, windows_nbytes
+
+
+def head_name(horizon):
+    return f'h{horizon}'
+
+
+def _finish(inputs, encoded, horizons, outputs, learning_rate):
+    if horizons is None:
+        out = Dense(outputs)(encoded)
+    else:
+        out = {head_name(h): Dense(1, name=head_name(h))(encoded) for h in horizons}
+    model = Model(inputs, out)
+    model.compile(optimizer=Adam(learning_rate), loss='mse')
+    return model
+
+
+def build_simplernn(window_size=60, n_features=1, units=64, dropout_rate=0.3,
+                    horizons=None, outputs=1, learning_rate=1e-3):
+    inputs = Input(shape=(window_size, n_features))
+    x = SimpleRNN(units)(inputs)
+    x = Dropout(dropout_rate)(x)
+    return _finish(inputs, x, horizons, outputs, learning_rate)
+
+
+def build_lstm(window_size=60, n_features=1, units=64, dropout_rate=0.3,
+               horizons=None, outputs=1, learning_rate=1e-3):
+    inputs = Input(shape=(window_size, n_features))
+    x = LSTM(units)(inputs)
+    x = Dropout(dropout_rate)(x)
+    return _finish(inputs, x, horizons, outputs, learning_rate)
+
+
+def build_bilstm(window_size=60, n_features=1, units=64, dropout_rate=0.3,
+                 horizons=None, outputs=1, learning_rate=1e-3):
+    """Bidirectional LSTM stack used by ``train_predict_model``."""
+    inputs = Input(shape=(window_size, n_features))
+    x = Bidirectional(LSTM(units, return_sequences=True))(inputs)
+    x = Dropout(dropout_rate)(x)
+    x = LSTM(units // 2)(x)
+    x = Dropout(0.2)(x)
+    return _finish(inputs, x, horizons, outputs, learning_rate)
+
+
+def build_seq2seq(window_size=60, n_features=1, units=100, outputs=1,
+                  learning_rate=1e-3, feedback=False):
+    """Encoder-decoder LSTM for the next ``outputs`` steps, shape (N, outputs, 1).
+
+    With ``feedback`` the decoder also sees the previous step's target
+    through a second input of shape (N, outputs, 1), for teacher-forced
+    training and autoregressive decoding (see :mod:`stock_prediction.seq2seq`).
+    """
+    inputs = Input(shape=(window_size, n_features))
+    encoded = LSTM(units, activation='relu')(inputs)
+    repeated = RepeatVector(outputs)(encoded)
+    if feedback:
+        previous = Input(shape=(outputs, 1), name='previous')
+        repeated = Concatenate()([repeated, previous])
+        inputs = [inputs, previous]
+    decoded = LSTM(units, activation='relu', return_sequences=True)(repeated)
+    output = TimeDistributed(Dense(1))(decoded)
+    model = Model(inputs, output)
+    model.compile(optimizer=Adam(learning_rate), loss='mse')
+    return model
+
+
+BUILDERS = {
+    'SimpleRNN': build_simplernn,
+    'LSTM': build_lstm,
+    'BiLSTM': build_bilstm,
+    'Seq2Seq': build_seq2seq,
+}
+
+
+def multi_horizon_targets(windows, rows):
+    """Per-head target dict for ``windows.Y[rows]``."""
+    return {head_name(h): windows.Y[rows, j] for j, h in enumerate(windows.horizons)}
+
+
+def fit_multi_horizon(model, windows, train_size, **fit_kwargs):
+    """Train a multi-output model on every horizon of ``windows`` at once.
+
+    Uses the training rows whose longest-horizon target falls before
+    ``train_size``, so all heads see the same samples.
+    """
+    n_train = train_size - windows.window_size - max(windows.horizons) + 1
+    if n_train < 1:
+        raise ValueError("train_size too small for the longest horizon")
+    rows = slice(0, n_train)
+    check_budget(windows_nbytes(windows.X[rows]) + windows.Y[rows].nbytes,
+                 "training windows")
+    return model.fit(windows.X[rows], multi_horizon_targets(windows, rows), **fit_kwargs)
+
+
+def predict_multi_horizon(model, windows, train_size, inverse_transform=None):
+    """Predict every horizon with one call over the test windows.
+
+    Returns ``{horizon: (y_test, pred)}`` with each horizon's rows trimmed
+    to those whose target exists, optionally mapped back to prices.
+    """
+    test_start = train_size - windows.window_size
+    X_test = windows.X[test_start:windows.n_valid(min(windows.horizons))]
+    preds = model.predict(X_test, verbose=0)
+
+    out = {}
+    for j, h in enumerate(windows.horizons):
+        n = windows.n_valid(h) - test_start
+        y_test = windows.Y[test_start:test_start + n, j].reshape(-1, 1)
+        pred = np.asarray(preds[head_name(h)])[:n].reshape(-1, 1)
+        if inverse_transform is not None:
+            y_test, pred = inverse_transform(y_test), inverse_transform(pred)
+        out[h] = (y_test, pred)
+    return out
+
+
+def multi_horizon_results(models, windows, train_size, inverse_transform=None):
+    """Per-horizon MSE for several multi-output models.
+
+    ``models`` maps a short name (e.g. ``'RNN'``, ``'LSTM'``) to a trained
+    multi-output model. The result has the layout of the per-horizon
+    ``results`` dict in ``final_project.py``, keyed by the names as given::
+
+        results[h] = {'RNN_MSE': ..., 'LSTM_MSE': ..., 'y_test': ...,
+                      'RNN_pred': ..., 'LSTM_pred': ...}
+
+    so :func:`~stock_prediction.evaluation.evaluate_results` accepts the same
+    names, e.g. ``baseline='RNN'``.
+    """
+    results = {h: {} for h in windows.horizons}
+    for name, model in models.items():
+        for h, (y_test, pred) in predict_multi_horizon(
+                model, windows, train_size, inverse_transform).items():
+            results[h][f'{name}_MSE'] = mean_squared_error(y_test, pred)
+            results[h]['y_test'] = y_test
+            results[h][f'{name}_pred'] = pred
+    return results
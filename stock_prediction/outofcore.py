@@ -0,0 +1,134 @@
+"""Out-of-core training input: memory-mapped features, windows built per batch.
+
+A fully materialised ``(N, window, F)`` array is ``window`` times the size
+of the feature matrix itself: tens of GB for years of minute bars. Here the
+scaled feature matrix lives in a ``.npy`` file that is memory-mapped, and
+:class:`WindowSequence` cuts each batch's windows out of it on demand::
+
+    data, scaler = scale_to_memmap(load_features('AAPL_1m.csv'), 'scaled.npy')
+    history = fit_out_of_core(net, data, window_size=60, horizon=1,
+                              n_train=int(len(data) * 0.8), epochs=10, workers=4)
+
+Shuffling is done in blocks of consecutive samples: the samples within each
+block are shuffled and cut into batches there, and the order of all the
+batches is shuffled. Every batch therefore reads one short contiguous span
+of the file (at most a block plus a window) rather than ``batch_size``
+random pages, which keeps throughput steady when the data is not in the
+page cache. Keras prefetches batches on ``workers`` threads.
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from tensorflow.keras.utils import PyDataset
+
+from .memory import DEFAULT_DTYPE
+
+
+def scale_to_memmap(values, path, scaler=None, chunk_rows=1 << 18, dtype=DEFAULT_DTYPE):
+    """Min-max scale ``values`` chunk by chunk into the ``.npy`` file ``path``.
+
+    ``values`` is any 2-D array-like, including a memory-mapped cache entry
+    or a DataFrame, and is never loaded whole. Without ``scaler`` a
+    ``MinMaxScaler`` is fitted with ``partial_fit`` over the same chunks.
+    Returns the read-only memmap of the scaled data and the scaler.
+    """
+    from sklearn.preprocessing import MinMaxScaler
+
+    if hasattr(values, 'to_numpy'):
+        values = values.to_numpy()
+    if scaler is None:
+        scaler = MinMaxScaler()
+        for start in range(0, len(values), chunk_rows):
+            scaler.partial_fit(np.asarray(values[start:start + chunk_rows]))
+    out = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=values.shape)
+    for start in range(0, len(values), chunk_rows):
+        out[start:start + chunk_rows] = scaler.transform(
+            np.asarray(values[start:start + chunk_rows]))
+    out.flush()
+    del out
+    return np.load(path, mmap_mode='r'), scaler
+
+
+class WindowSequence(PyDataset):
+    """Keras input of ``(X, y)`` window batches cut from a 2-D array on demand.
+
+    Sample ``i`` is the same as in :func:`~stock_prediction.windows.make_windows`:
+    ``data[i:i + window_size]`` with target ``data[i + window_size + horizon - 1,
+    target_col]``. ``rows`` (a slice of sample indices) restricts the
+    sequence to e.g. the training or validation samples. ``block_size``
+    samples are shuffled together (default ``64 * batch_size``, rounded up
+    to whole batches), and no batch crosses a block boundary.
+    ``workers``/``use_multiprocessing``/``max_queue_size`` go to
+    ``PyDataset`` and control prefetching.
+    """
+
+    def __init__(self, data, window_size, horizon=1, target_col=0, rows=None,
+                 batch_size=32, shuffle=True, block_size=None, seed=0, **kwargs):
+        super().__init__(**kwargs)
+        self.data = data
+        self.window_size = window_size
+        self.horizon = horizon
+        self.target_col = target_col
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        block_size = block_size or 64 * batch_size
+        self.block_size = -(-block_size // batch_size) * batch_size
+        n_samples = len(data) - window_size - horizon + 1
+        if n_samples < 1:
+            raise ValueError(f"series of length {len(data)} is too short for "
+                             f"window_size={window_size}, horizon={horizon}")
+        self.samples = range(n_samples)[rows if rows is not None else slice(None)]
+        self._rng = np.random.default_rng(seed)
+        self._batches = None
+        self.on_epoch_end()
+
+    def __len__(self):
+        # blocks are whole batches, so only the last block has a short one
+        return -(-len(self.samples) // self.batch_size)
+
+    def on_epoch_end(self):
+        order = np.arange(self.samples.start, self.samples.stop, self.samples.step)
+        if not self.shuffle:
+            self._batches = [order[i:i + self.batch_size]
+                             for i in range(0, len(order), self.batch_size)]
+            return
+        batches = []
+        for start in range(0, len(order), self.block_size):
+            block = order[start:start + self.block_size].copy()
+            self._rng.shuffle(block)
+            batches.extend(block[i:i + self.batch_size]
+                           for i in range(0, len(block), self.batch_size))
+        self._rng.shuffle(batches)
+        self._batches = batches
+
+    def __getitem__(self, index):
+        batch = self._batches[index]
+        lo, hi = int(batch.min()), int(batch.max())
+        # one contiguous read covering every window and target in the batch
+        span = np.asarray(self.data[lo:hi + self.window_size + self.horizon])
+        windows = sliding_window_view(span, self.window_size, axis=0).transpose(0, 2, 1)
+        X = windows[batch - lo]
+        y = span[batch - lo + self.window_size + self.horizon - 1, self.target_col]
+        return X, y
+
+
+def fit_out_of_core(net, data, window_size, horizon, n_train, batch_size=32,
+                    validation_split=0.1, target_col=0, workers=1,
+                    use_multiprocessing=False, max_queue_size=10, seed=0, **fit_kwargs):
+    """``net.fit`` on the first ``n_train`` samples of ``data`` without materialising them.
+
+    Like Keras' ``validation_split``, the last ``validation_split`` of the
+    training samples (unshuffled) are held out for validation.
+    """
+    n_val = int(n_train * validation_split)
+    loader = {'workers': workers, 'use_multiprocessing': use_multiprocessing,
+              'max_queue_size': max_queue_size}
+    train = WindowSequence(data, window_size, horizon, target_col,
+                           rows=slice(0, n_train - n_val), batch_size=batch_size,
+                           shuffle=True, seed=seed, **loader)
+    val = None
+    if n_val:
+        val = WindowSequence(data, window_size, horizon, target_col,
+                             rows=slice(n_train - n_val, n_train), batch_size=batch_size,
+                             shuffle=False, **loader)
+    return net.fit(train, validation_data=val, **fit_kwargs)
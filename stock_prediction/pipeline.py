@@ -0,0 +1,157 @@
+"""``tf.data`` training input with parallel window assembly, caching and prefetch.
+
+``model.fit(X, y, validation_split=0.1)`` copies the windows into tensors,
+slices a copy of the tail for validation, and leaves TensorFlow's thread
+pools at their defaults. Here the scaled feature matrix is the only
+tensor. Each dataset is a range of sample indices, so training and
+validation are two chronological ranges of the same data and neither is
+copied. Windows are gathered from the matrix a batch at a time, on parallel
+``map`` calls, and the next batches are prefetched while the model trains::
+
+    configure_threads(intra_op=16, inter_op=2)      # before any TF work
+    history = fit_pipeline(net, prepared.scaled, 60, horizon=5, n_train=2300,
+                           batch_size=256, epochs=30)
+    history.history['samples_per_sec']
+
+With ``cache`` every window is assembled once, into a single array, and
+each epoch only shuffles sample indices and takes its batches from that
+array, so the shuffle never holds a second copy of the windows. By default
+this happens only when a memory budget is set and the windows fit it;
+otherwise each batch's windows are gathered from the matrix as needed, and
+the windows are never materialised.
+"""
+
+import time
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .memory import DEFAULT_DTYPE, MemoryBudgetError, check_budget, memory_budget
+
+
+def configure_threads(intra_op=None, inter_op=None):
+    """Size TensorFlow's intra-op and inter-op thread pools (``0``: TF default).
+
+    Must be called before TensorFlow runs its first operation. Returns the
+    settings in effect.
+    """
+    import tensorflow as tf
+
+    try:
+        if intra_op is not None:
+            tf.config.threading.set_intra_op_parallelism_threads(intra_op)
+        if inter_op is not None:
+            tf.config.threading.set_inter_op_parallelism_threads(inter_op)
+    except RuntimeError as exc:
+        raise RuntimeError("thread pools must be configured before TensorFlow "
+                           "runs any operation") from exc
+    return {'intra_op': tf.config.threading.get_intra_op_parallelism_threads(),
+            'inter_op': tf.config.threading.get_inter_op_parallelism_threads()}
+
+
+def window_dataset(data, window_size, horizon=1, target_col=0, rows=None, batch_size=32,
+                   shuffle=False, cache=None, seed=0, threads=None):
+    """``tf.data.Dataset`` of ``(X, y)`` window batches over the 2-D array ``data``.
+
+    Sample ``i`` is the same as in
+    :func:`~stock_prediction.windows.make_windows`. ``rows`` (a slice of
+    sample indices) restricts it to e.g. the training or validation range.
+    ``cache=None`` caches the assembled windows (one copy: shuffling only
+    permutes indices) when a memory budget is set and they fit it. ``data``
+    keeps its float dtype. ``threads`` gives the pipeline a private thread
+    pool of that size instead of sharing TensorFlow's inter-op pool.
+    """
+    import tensorflow as tf
+
+    data = np.asarray(data)
+    if not np.issubdtype(data.dtype, np.floating):
+        data = data.astype(DEFAULT_DTYPE)
+    n_samples = len(data) - window_size - horizon + 1
+    if n_samples < 1:
+        raise ValueError(f"series of length {len(data)} is too short for "
+                         f"window_size={window_size}, horizon={horizon}")
+    samples = range(n_samples)[rows if rows is not None else slice(None)]
+    n = len(samples)
+    if cache is None:
+        # without a budget there is no evidence the windows fit; gather per batch
+        cache = memory_budget() is not None
+        try:
+            check_budget(n * window_size * data.shape[1] * data.itemsize, "cached windows")
+        except MemoryBudgetError:
+            cache = False
+
+    if cache:
+        # every window assembled once; the dataset yields positions into them
+        view = sliding_window_view(data, window_size, axis=0).transpose(0, 2, 1)
+        X_all = np.ascontiguousarray(view[samples.start:samples.stop:samples.step])
+        y_all = data[samples.start + window_size + horizon - 1::samples.step, target_col][:n]
+        dtype = tf.as_dtype(data.dtype)
+
+        def gather(i):
+            X, y = tf.numpy_function(lambda i: (X_all[i], y_all[i]), [i], (dtype, dtype))
+            X.set_shape((None, window_size, data.shape[1]))
+            y.set_shape((None,))
+            return X, y
+
+        ds = tf.data.Dataset.range(n)
+    else:
+        base = tf.constant(data)
+        target = tf.constant(data[:, target_col])
+        offsets = tf.range(window_size, dtype=tf.int64)
+
+        def gather(i):
+            X = tf.gather(base, i[:, None] + offsets)
+            return X, tf.gather(target, i + window_size + horizon - 1)
+
+        ds = tf.data.Dataset.range(samples.start, samples.stop, samples.step)
+    if shuffle:
+        # a buffer of sample indices, not of windows
+        ds = ds.shuffle(n, seed=seed, reshuffle_each_iteration=True)
+    ds = ds.batch(batch_size).map(gather, num_parallel_calls=tf.data.AUTOTUNE)
+    ds = ds.prefetch(tf.data.AUTOTUNE)
+    if threads:
+        options = tf.data.Options()
+        options.threading.private_threadpool_size = threads
+        ds = ds.with_options(options)
+    return ds
+
+
+def _throughput_callback(n_samples):
+    from tensorflow.keras.callbacks import Callback
+
+    class Throughput(Callback):
+        # adds samples_per_sec to the epoch logs, and so to the History
+        def on_epoch_begin(self, epoch, logs=None):
+            self._start = time.perf_counter()
+
+        def on_epoch_end(self, epoch, logs=None):
+            seconds = time.perf_counter() - self._start
+            if logs is not None:
+                logs['samples_per_sec'] = n_samples / seconds if seconds else 0.0
+
+    return Throughput()
+
+
+def fit_pipeline(net, data, window_size, horizon, n_train, batch_size=32,
+                 validation_split=0.1, target_col=0, cache=None, seed=0, threads=None,
+                 callbacks=(), **fit_kwargs):
+    """``net.fit`` on the first ``n_train`` samples of ``data`` through ``tf.data``.
+
+    As with Keras' ``validation_split``, the last ``validation_split`` of the
+    training samples are held out for validation. They are not shuffled or
+    copied. The training range is reshuffled every epoch. The returned
+    history also has ``samples_per_sec`` for each epoch (the first includes
+    graph tracing and filling the cache).
+    """
+    n_val = int(n_train * validation_split)
+    options = {'window_size': window_size, 'horizon': horizon, 'target_col': target_col,
+               'batch_size': batch_size, 'cache': cache, 'threads': threads}
+    train = window_dataset(data, rows=slice(0, n_train - n_val), shuffle=True, seed=seed,
+                           **options)
+    val = None
+    if n_val:
+        val = window_dataset(data, rows=slice(n_train - n_val, n_train), **options)
+    callbacks = [_throughput_callback(n_train - n_val), *callbacks]
+    # the dataset shuffles itself
+    return net.fit(train, validation_data=val, callbacks=callbacks, shuffle=False,
+                   **fit_kwargs)
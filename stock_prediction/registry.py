@@ -0,0 +1,141 @@
+"""On-disk registry of trained models keyed by everything that shaped them.
+
+An entry's key hashes the feature frame it was trained on together with the
+training configuration (features, window size, horizon, architecture and
+hyperparameters). A run with identical inputs loads the saved model and
+skips training. A run on the same history plus a few new bars warm-starts
+from the newest entry whose data is a prefix of the current frame.
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from .data import default_cache_dir
+from .training import evaluate_model, train_model
+
+# train_model arguments that change how a model is fed or logged, not the model
+INPUT_KWARGS = ('callbacks', 'verbose', 'metrics', 'out_of_core', 'tf_data', 'threads')
+
+
+def frame_digest(frame, n_rows=None):
+    """SHA-256 of the first ``n_rows`` rows (index and values) of ``frame``."""
+    part = frame if n_rows is None else frame.iloc[:n_rows]
+    h = hashlib.sha256()
+    h.update(json.dumps(list(map(str, part.columns))).encode())
+    h.update(np.ascontiguousarray(part.index.to_numpy()).view(np.uint8))
+    h.update(np.ascontiguousarray(part.to_numpy()).view(np.uint8))
+    return h.hexdigest()
+
+
+def _digest(obj):
+    return hashlib.sha256(json.dumps(obj, sort_keys=True).encode()).hexdigest()[:32]
+
+
+class ModelRegistry:
+    """Directory of ``<key>.keras`` models with ``<key>.json`` metadata."""
+
+    def __init__(self, root=None):
+        self.root = root or os.path.join(default_cache_dir(), 'models')
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key, ext):
+        return os.path.join(self.root, key + ext)
+
+    def entries(self):
+        for name in sorted(os.listdir(self.root)):
+            if name.endswith('.json'):
+                with open(os.path.join(self.root, name)) as f:
+                    yield json.load(f)
+
+    def load(self, key):
+        from tensorflow.keras.models import load_model
+
+        if not os.path.exists(self._path(key, '.json')):
+            return None
+        return load_model(self._path(key, '.keras'))
+
+    def save(self, net, key, meta):
+        net.save(self._path(key, '.keras'))
+        # metadata is written last so a half-saved model is never picked up
+        tmp = self._path(key, '.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump({**meta, 'key': key}, f)
+        os.replace(tmp, self._path(key, '.json'))
+
+    def nearest(self, config_key, frame):
+        """Newest entry for ``config_key`` trained on a prefix of ``frame``."""
+        candidates = [e for e in self.entries()
+                      if e['config_key'] == config_key and e['n_rows'] < len(frame)]
+        for entry in sorted(candidates, key=lambda e: e['n_rows'], reverse=True):
+            if frame_digest(frame, entry['n_rows']) == entry['data_digest']:
+                return entry
+        return None
+
+    def latest(self, prepared, horizon, model='LSTM'):
+        """Most recent model for this data, horizon and architecture.
+
+        Matches on features, window size, horizon and architecture with any
+        training hyperparameters, and prefers the entry trained on the
+        longest prefix of ``prepared.frame``. Returns ``(net, entry)`` or
+        ``(None, None)``.
+        """
+        features = list(prepared.frame.columns)
+        best = None
+        for entry in self.entries():
+            config = entry['config']
+            if (config['features'] != features or config['horizon'] != horizon
+                    or config['model'] != model
+                    or config['window_size'] != prepared.windows.window_size
+                    or entry['n_rows'] > len(prepared.frame)):
+                continue
+            if best is not None and entry['n_rows'] <= best['n_rows']:
+                continue
+            if frame_digest(prepared.frame, entry['n_rows']) == entry['data_digest']:
+                best = entry
+        if best is None:
+            return None, None
+        return self.load(best['key']), best
+
+    def fetch_or_train(self, prepared, horizon, model='LSTM', warm_epochs=5,
+                       **train_kwargs):
+        """Return ``(net, mse, status)`` for one horizon/architecture.
+
+        ``status`` is ``'cached'`` when an identical run was found (no
+        training), ``'warm'`` when training resumed from a model fitted on
+        an earlier prefix of the data for ``warm_epochs`` epochs, and
+        ``'trained'`` for a fresh fit. ``train_kwargs`` go to
+        :func:`~stock_prediction.training.train_model`. Those in
+        ``INPUT_KWARGS`` do not change the model and are not part of its key.
+        """
+        config = {'features': list(prepared.frame.columns),
+                  'window_size': prepared.windows.window_size,
+                  'train_size': prepared.train_frac,
+                  'horizon': horizon, 'model': model,
+                  'params': {k: v for k, v in train_kwargs.items()
+                             if k not in INPUT_KWARGS}}
+        config_key = _digest(config)
+        data_digest = frame_digest(prepared.frame)
+        key = _digest({'config': config_key, 'data': data_digest})
+
+        net = self.load(key)
+        if net is not None:
+            mse = evaluate_model(prepared, net, horizon)[0]
+            return net, mse, 'cached'
+
+        status = 'trained'
+        base = self.nearest(config_key, prepared.frame)
+        if base is not None:
+            warm = self.load(base['key'])
+            if warm is not None:
+                train_kwargs = {**train_kwargs, 'epochs': warm_epochs,
+                                'init_weights': warm.get_weights()}
+                status = 'warm'
+
+        net, _, mse, _, _ = train_model(prepared, horizon, model, **train_kwargs)
+        self.save(net, key, {'config_key': config_key, 'config': config,
+                             'data_digest': data_digest,
+                             'n_rows': len(prepared.frame), 'MSE': float(mse)})
+        return net, mse, status
@@ -0,0 +1,191 @@
+"""Headless figure rendering for prediction and loss plots.
+
+Figures are drawn with the Agg backend straight to PNG files, in a
+background process pool, so rendering never blocks on a display and runs
+alongside training. Long series are reduced to at most ``max_points`` with
+Largest-Triangle-Three-Buckets (LTTB). LTTB keeps the visual shape (peaks,
+troughs, trend changes), so drawing cost stays flat however long the
+history is::
+
+    with ReportRenderer('reports') as report:
+        report.predictions('pred_5d.png', y_test, {'LSTM': pred}, '5-Day Ahead')
+        report.history('loss_5d.png', history.history, '5-Day Model Loss')
+"""
+
+import multiprocessing
+import os
+import sys
+import types
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+
+DEFAULT_MAX_POINTS = 2000
+
+
+def lttb(y, n_out, x=None):
+    """Indices of the ``n_out`` points LTTB keeps from the series ``y``.
+
+    The first and last points are always kept. Series already shorter than
+    ``n_out`` are returned whole.
+    """
+    y = np.asarray(y, dtype=np.float64).ravel()
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.arange(n, dtype=np.float64) if x is None else np.asarray(x, dtype=np.float64)
+    y = np.where(np.isnan(y), np.nanmean(y) if np.isfinite(y).any() else 0.0, y)
+
+    every = (n - 2) / (n_out - 2)
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = int(i * every) + 1, int((i + 1) * every) + 1
+        next_lo, next_hi = hi, min(int((i + 2) * every) + 1, n)
+        avg_x, avg_y = x[next_lo:next_hi].mean(), y[next_lo:next_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a])
+                      - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def downsample(y, max_points=DEFAULT_MAX_POINTS):
+    """``(x, y)`` with at most ``max_points`` points, x being original positions."""
+    y = np.asarray(y).ravel()
+    keep = lttb(y, max_points)
+    return keep, y[keep]
+
+
+def _save(fig, path):
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    FigureCanvasAgg(fig)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    fig.tight_layout()
+    fig.savefig(path)
+    return path
+
+
+def render_predictions(path, series, title, xlabel='Time Step', ylabel='Price'):
+    """Draw already-downsampled ``{label: (x, y)}`` series to ``path``."""
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(12, 5))
+    ax = fig.add_subplot()
+    for label, (x, y) in series.items():
+        ax.plot(x, y, label=label)
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.legend()
+    ax.grid(True)
+    return _save(fig, path)
+
+
+def render_history(path, history, title):
+    """Draw train/validation loss curves from a Keras ``history.history`` dict."""
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(8, 4))
+    ax = fig.add_subplot()
+    ax.plot(history['loss'], label='Train Loss')
+    if 'val_loss' in history:
+        ax.plot(history['val_loss'], label='Val Loss')
+    ax.set_title(title)
+    ax.set_xlabel('Epochs')
+    ax.set_ylabel('Loss')
+    ax.legend()
+    ax.grid(True)
+    return _save(fig, path)
+
+
+@contextmanager
+def _main_hidden():
+    # a spawned worker re-runs the parent's __main__ unless it has no file; the
+    # workers only need this module, and the caller is often an unguarded script
+    main = sys.modules['__main__']
+    sys.modules['__main__'] = types.ModuleType('__main__')
+    try:
+        yield
+    finally:
+        sys.modules['__main__'] = main
+
+
+class ReportRenderer:
+    """Queue figures for rendering in a background process pool.
+
+    ``predictions`` and ``history`` return immediately with a future. The
+    series are downsampled in the caller before being sent to a worker.
+    ``close`` (or leaving the ``with`` block) waits for every figure and
+    returns their paths.
+    """
+
+    def __init__(self, out_dir='reports', max_workers=2, max_points=DEFAULT_MAX_POINTS):
+        self.out_dir = out_dir
+        self.max_points = max_points
+        # spawned, not forked: the caller usually has TensorFlow's threads running
+        self._pool = ProcessPoolExecutor(max_workers,
+                                         mp_context=multiprocessing.get_context('spawn'))
+        self._futures = []
+
+    def _path(self, name):
+        return os.path.join(self.out_dir, name)
+
+    def _submit(self, fn, *args, **kwargs):
+        # workers are started on submit
+        with _main_hidden():
+            future = self._pool.submit(fn, *args, **kwargs)
+        self._futures.append(future)
+        return future
+
+    def predictions(self, name, actual, predictions, title, **labels):
+        """Actual-vs-predicted figure; ``predictions`` maps label to series."""
+        series = {'Actual Price': downsample(actual, self.max_points)}
+        for label, pred in predictions.items():
+            series[label] = downsample(pred, self.max_points)
+        return self._submit(render_predictions, self._path(name), series, title, **labels)
+
+    def history(self, name, history, title):
+        history = {k: list(map(float, v)) for k, v in history.items()}
+        return self._submit(render_history, self._path(name), history, title)
+
+    def close(self):
+        paths = [future.result() for future in self._futures]
+        self._pool.shutdown()
+        return paths
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _non_interactive_backends():
+    try:
+        from matplotlib.backends import BackendFilter, backend_registry
+    except ImportError:
+        # matplotlib < 3.9
+        from matplotlib.rcsetup import non_interactive_bk
+
+        return {name.lower() for name in non_interactive_bk}
+    return set(backend_registry.list_builtin(BackendFilter.NON_INTERACTIVE))
+
+
+def is_headless():
+    """True when ``plt.show()`` would not display anything.
+
+    That is the case when matplotlib runs a non-interactive backend such as
+    Agg, which it picks by itself when there is no display. Desktop,
+    Jupyter and Colab backends are interactive. Set
+    ``STOCK_PREDICTION_HEADLESS`` to ``1`` or ``0`` to override.
+    """
+    override = os.environ.get('STOCK_PREDICTION_HEADLESS')
+    if override in ('0', '1'):
+        return override == '1'
+    import matplotlib
+
+    return matplotlib.get_backend().lower() in _non_interactive_backends()
@@ -0,0 +1,179 @@
+"""Run the (horizon, architecture, hyperparameter) grid across a process pool.
+
+Each worker is a fresh ``spawn`` process with its own TensorFlow thread
+budget. Finished jobs are appended to an optional JSON-lines file as they
+complete, so a crashed worker never loses completed work. A crash breaks
+the pool and fails every unfinished job with it. Those jobs are rerun with
+one pool each, so the next crash is charged only to the job that caused
+it. A job that crashes its own pool more than ``retries`` times is reported
+with status 'crashed'.
+"""
+
+import itertools
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+import pandas as pd
+
+
+def make_grid(horizons=(1, 5, 10), models=('SimpleRNN', 'LSTM'), param_grid=None):
+    """Every combination of horizon, model name and ``param_grid`` values."""
+    param_grid = param_grid or {}
+    names = sorted(param_grid)
+    jobs = []
+    for horizon, model in itertools.product(horizons, models):
+        for values in itertools.product(*(param_grid[n] for n in names)):
+            jobs.append({'horizon': horizon, 'model': model,
+                         'params': dict(zip(names, values))})
+    return jobs
+
+
+def job_key(job):
+    return json.dumps(job, sort_keys=True)
+
+
+def set_thread_budget(threads):
+    """Limit TensorFlow (and BLAS/OpenMP) to ``threads`` per process.
+
+    Must run before TensorFlow executes its first op.
+    """
+    for var in ('OMP_NUM_THREADS', 'TF_NUM_INTRAOP_THREADS', 'TF_NUM_INTEROP_THREADS'):
+        os.environ[var] = str(threads)
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(threads)
+
+
+_PREPARED = {}
+
+
+def get_prepared(data_path, features=(), window_size=60, horizons=(1, 5, 10)):
+    """``prepare_data`` memoised per process.
+
+    Every job a worker runs on the same data shares one set of windows.
+    """
+    from .training import prepare_data
+
+    key = (data_path, tuple(features), window_size, tuple(horizons))
+    if key not in _PREPARED:
+        _PREPARED[key] = prepare_data(data_path, features, window_size, horizons)
+    return _PREPARED[key]
+
+
+def train_job(job, data_path, features=(), window_size=60, horizons=(1, 5, 10),
+              **train_kwargs):
+    """Default job: train one model on ``data_path`` and return its MSE."""
+    from .training import train_model
+
+    prepared = get_prepared(data_path, features, window_size, horizons)
+    start = time.perf_counter()
+    _, history, mse, _, _ = train_model(prepared, job['horizon'], job['model'],
+                                        **train_kwargs, **job['params'])
+    return {'epochs': len(history.history['loss']), 'MSE': float(mse),
+            'seconds': time.perf_counter() - start}
+
+
+def _call(fn, job):
+    return fn(job)
+
+
+def _pool(max_workers, tf_threads):
+    return ProcessPoolExecutor(max_workers, mp_context=multiprocessing.get_context('spawn'),
+                               initializer=set_thread_budget, initargs=(tf_threads,))
+
+
+def _collect(futures, record):
+    # record finished jobs; return those lost to a broken pool
+    lost = []
+    for future in as_completed(futures):
+        job = futures[future]
+        try:
+            record({'job': job, 'status': 'ok', **future.result()})
+        except BrokenProcessPool:
+            lost.append(job)
+        except Exception as exc:
+            record({'job': job, 'status': 'error', 'error': repr(exc)})
+    return lost
+
+
+def run_jobs(jobs, fn, max_workers=None, tf_threads=1, results_path=None,
+             retries=2):
+    """Run ``fn(job)`` for every job and return one result dict per job.
+
+    ``fn`` must be picklable (a module-level function or a
+    ``functools.partial`` of one) and return a dict, which is stored next
+    to the job and its status. Jobs already present in ``results_path`` are not rerun.
+    """
+    done = {}
+    if results_path and os.path.exists(results_path):
+        with open(results_path) as f:
+            for line in f:
+                record = json.loads(line)
+                if record.get('status') == 'ok':
+                    done[job_key(record['job'])] = record
+
+    pending = [job for job in jobs if job_key(job) not in done]
+    attempts = {}
+    if max_workers is None:
+        max_workers = max(1, (os.cpu_count() or 1) // tf_threads)
+
+    def record(entry):
+        done[job_key(entry['job'])] = entry
+        if results_path:
+            with open(results_path, 'a') as f:
+                f.write(json.dumps(entry) + '\n')
+
+    suspects = []
+    if pending:
+        with _pool(max_workers, tf_threads) as pool:
+            suspects = _collect({pool.submit(_call, fn, job): job for job in pending},
+                                record)
+
+    # Jobs that were only waiting when the pool broke are not charged. Each
+    # runs in a pool of its own, so a broken pool identifies its culprit.
+    while suspects:
+        batch, suspects = suspects[:max_workers], suspects[max_workers:]
+        pools = [_pool(1, tf_threads) for _ in batch]
+        try:
+            crashed = _collect({pool.submit(_call, fn, job): job
+                                for pool, job in zip(pools, batch)}, record)
+        finally:
+            for pool in pools:
+                pool.shutdown()
+        for job in crashed:
+            attempts[job_key(job)] = attempts.get(job_key(job), 0) + 1
+            if attempts[job_key(job)] > retries:
+                record({'job': job, 'status': 'crashed'})
+            else:
+                suspects.append(job)
+
+    return [done[job_key(job)] for job in jobs if job_key(job) in done]
+
+
+def run_grid(jobs, data_path, max_workers=None, tf_threads=1, results_path=None,
+             retries=2, **train_kwargs):
+    """Train every job in ``jobs`` on ``data_path`` with :func:`train_job`."""
+    fn = partial(train_job, data_path=data_path, **train_kwargs)
+    return run_jobs(jobs, fn, max_workers, tf_threads, results_path, retries)
+
+
+def summary_table(results):
+    """Horizon x model table of MSE, like ``results_summary`` in the script.
+
+    Jobs with hyperparameters get one column per setting, e.g.
+    ``'LSTM units=32 MSE'``.
+    """
+    rows = {}
+    for entry in results:
+        if entry.get('status') != 'ok':
+            continue
+        job = entry['job']
+        params = ' '.join(f'{k}={v}' for k, v in sorted(job['params'].items()))
+        column = ' '.join(filter(None, [job['model'], params, 'MSE']))
+        rows.setdefault(job['horizon'], {})[column] = entry['MSE']
+    return pd.DataFrame(rows).T.sort_index()
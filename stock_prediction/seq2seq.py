@@ -0,0 +1,143 @@
+"""One seq2seq forecaster for every horizon up to the one it was trained on.
+
+The script's seq2seq section trains a new encoder-decoder for each
+``output_len``. Step ``k`` of a model trained on ``max_len`` steps is
+already a ``k``-step-ahead forecast, so a single model trained at the
+longest horizon serves every shorter one by truncating its output. One
+``predict`` then covers all horizons::
+
+    net = build_seq2seq(window_size, n_features, outputs=10)
+    forecaster = Seq2SeqForecaster(net)
+    forecaster.fit(train_data, epochs=20, batch_size=32, validation_split=0.1)
+    results = seq2seq_results(forecaster, test_data, [1, 5, 10])
+
+The autoregressive mode runs the Keras encoder once per window and then
+decodes step by step in NumPy (the LSTM step of
+:mod:`~stock_prediction.inference`), with every window of the batch decoded
+in parallel. For a ``feedback`` model (trained with teacher forcing) each
+step's forecast is fed back as the next step's input. Otherwise the decoder
+sees the encoder output at every step, as ``RepeatVector`` does, so
+decoding can also run past ``max_len``.
+"""
+
+import numpy as np
+
+from .inference import RECURRENT, _apply, _layer_spec
+from .memory import DEFAULT_DTYPE
+from .training import check_fit_budget, predict_in_chunks
+from .windows import make_windows
+
+
+def teacher_forcing(X, y, target_col=0):
+    """Inputs ``[X, previous]`` for training a ``feedback`` seq2seq model.
+
+    ``previous[:, t]`` is the true target of step ``t - 1``. For the first
+    step it is the last observed value in the window.
+    """
+    y = np.asarray(y).reshape(len(y), -1)
+    last = np.asarray(X[:, -1, target_col])[:, None]
+    previous = np.concatenate([last, y[:, :-1]], axis=1)
+    return [X, previous[..., None].astype(y.dtype)]
+
+
+class Seq2SeqForecaster:
+    """Direct and autoregressive multi-step forecasts from one seq2seq model.
+
+    ``net`` comes from :func:`~stock_prediction.models.build_seq2seq`, with
+    or without ``feedback``.
+    """
+
+    def __init__(self, net, target_col=0):
+        from tensorflow.keras.models import Model
+
+        self.net = net
+        self.target_col = target_col
+        self.feedback = len(net.inputs) == 2
+        layers = {type(layer).__name__: [] for layer in net.layers}
+        for layer in net.layers:
+            layers[type(layer).__name__].append(layer)
+        encoder, decoder = layers['LSTM']
+        self.max_len = layers['RepeatVector'][0].get_config()['n']
+        self.window_size = net.inputs[0].shape[1]
+        self.encoder = Model(net.inputs[0], encoder.output)
+        self._decoder = decoder
+        self._head = layers['TimeDistributed'][0]
+
+    def fit(self, data, **fit_kwargs):
+        """Train on every ``max_len``-step window of the scaled ``data``."""
+        X, y = make_windows(data, self.window_size, output_length=self.max_len,
+                            target_col=self.target_col)
+        y = y[..., None]
+        check_fit_budget(X, y)
+        inputs = teacher_forcing(X, y, self.target_col) if self.feedback else X
+        return self.net.fit(inputs, y, **fit_kwargs)
+
+    def encode(self, X, batch_size=None):
+        return predict_in_chunks(self.encoder, X, batch_size)
+
+    def decode(self, encoded, steps, last=None):
+        """Decode ``steps`` forecasts for a batch of encoder outputs, ``(N, steps)``.
+
+        ``last`` is each window's last observed target. Feedback models
+        need it as their first-step input.
+        """
+        # read the weights now, since the model may have been trained since
+        spec, weights = _layer_spec(self._decoder)
+        head_spec, head_weights = _layer_spec(self._head)
+        encoded = np.asarray(encoded, dtype=DEFAULT_DTYPE)
+        out = np.empty((len(encoded), steps), encoded.dtype)
+        previous = None if last is None else np.asarray(last, encoded.dtype).reshape(-1, 1)
+        if self.feedback and previous is None:
+            raise ValueError("a feedback model needs the last observed value")
+        state = None
+        for t in range(steps):
+            x = np.concatenate([encoded, previous], axis=1) if self.feedback else encoded
+            h, state = RECURRENT[spec['type']](x[:, None], spec, weights, state)
+            previous = _apply(h[:, -1], head_spec, head_weights)
+            out[:, t] = previous[:, 0]
+        return out
+
+    def predict(self, X, output_len=None, mode='direct', batch_size=None):
+        """``output_len``-step forecasts (default ``max_len``), shape ``(N, output_len)``.
+
+        ``'direct'`` runs the Keras model once and truncates its output.
+        ``'autoregressive'`` encodes once and decodes only ``output_len`` steps.
+        Feedback models can only decode autoregressively.
+        """
+        output_len = output_len or self.max_len
+        if mode == 'autoregressive':
+            last = np.asarray(X[:, -1, self.target_col])
+            return self.decode(self.encode(X, batch_size), output_len, last)
+        if mode != 'direct':
+            raise ValueError(f"mode must be 'direct' or 'autoregressive', got {mode!r}")
+        if self.feedback:
+            raise ValueError("feedback models decode autoregressively")
+        if output_len > self.max_len:
+            raise ValueError(f"trained for {self.max_len} steps, asked for {output_len}")
+        pred = predict_in_chunks(self.net, X, batch_size)
+        return pred[:, :output_len, 0]
+
+
+def seq2seq_results(forecaster, data, output_lens, mode='direct', inverse_transform=None):
+    """``{output_len: (y_test, pred)}`` from one forecast per window of ``data``.
+
+    Windows are cut by :func:`~stock_prediction.windows.make_windows` with
+    ``output_length=output_len`` for each ``output_len``.
+    Those for longer outputs are a prefix of those for the shortest, so the
+    model runs once on the shortest set for the longest output, and each
+    horizon takes its rows and steps from that. Both arrays are
+    ``(n, output_len)``, optionally mapped back to prices.
+    """
+    output_lens = sorted(output_lens)
+    X, _ = make_windows(data, forecaster.window_size, output_length=output_lens[0],
+                        target_col=forecaster.target_col)
+    pred = forecaster.predict(X, output_lens[-1], mode)
+    out = {}
+    for n_steps in output_lens:
+        _, y = make_windows(data, forecaster.window_size, output_length=n_steps,
+                            target_col=forecaster.target_col)
+        y_test, p = np.asarray(y), pred[:len(y), :n_steps]
+        if inverse_transform is not None:
+            y_test, p = inverse_transform(y_test), inverse_transform(p)
+        out[n_steps] = (y_test, p)
+    return out
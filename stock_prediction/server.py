@@ -0,0 +1,280 @@
+"""Local prediction server with request micro-batching.
+
+Loads exported horizon models (see :mod:`~stock_prediction.inference`)
+once and serves JSON over HTTP on a local port or a Unix socket. Requests
+that arrive within ``max_delay`` seconds of each other are stacked and
+run through the models as one batch, so the per-call overhead is paid per
+batch rather than per request::
+
+    stock-prediction serve lstm_h1.npz lstm_h5.npz --unix /tmp/forecast.sock
+
+    POST /predict  {"windows": {"AAPL": [[price, MA10, ...], ...]}}
+                -> {"forecasts": {"AAPL": {"1": 151.2, "5": 153.0}}}
+    GET  /stats    latency p50/p99 (ms), requests/s, mean batch size
+    GET  /health
+
+Windows are raw (unscaled) feature rows, oldest first. Each model's stored
+scaler is applied on the way in, and its inverse on the target column on
+the way out.
+"""
+
+import collections
+import http.client
+import json
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from .inference import NumpyModel
+
+
+class LatencyStats:
+    """Rolling request latencies and batch sizes for the ``/stats`` endpoint."""
+
+    def __init__(self, keep=10000):
+        self.latencies = collections.deque(maxlen=keep)
+        self.batch_sizes = collections.deque(maxlen=keep)
+        self.requests = 0
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def record_batch(self, latencies):
+        with self._lock:
+            self.latencies.extend(latencies)
+            self.batch_sizes.append(len(latencies))
+            self.requests += len(latencies)
+
+    def snapshot(self):
+        with self._lock:
+            latencies = np.array(self.latencies)
+            batches = np.array(self.batch_sizes)
+            requests = self.requests
+        uptime = time.perf_counter() - self.started
+        stats = {'requests': requests, 'uptime_s': uptime,
+                 'requests_per_s': requests / uptime if uptime else 0.0,
+                 'batches': len(batches),
+                 'mean_batch_size': float(batches.mean()) if len(batches) else None}
+        for q in (50, 90, 99):
+            stats[f'p{q}_ms'] = (float(np.percentile(latencies, q)) * 1e3
+                                 if len(latencies) else None)
+        return stats
+
+
+class MicroBatcher:
+    """Coalesce concurrent calls of ``fn`` on single rows into batched calls.
+
+    ``submit(row)`` returns a future. A worker thread waits for the first
+    pending row, keeps collecting until ``max_batch`` rows or ``max_delay``
+    seconds have passed, then calls ``fn`` once on the stacked rows and
+    resolves every future with its own result row.
+    """
+
+    def __init__(self, fn, max_batch=64, max_delay=0.002, stats=None):
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.stats = stats or LatencyStats()
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def submit(self, row):
+        future = Future()
+        self._queue.put((row, future, time.perf_counter()))
+        return future
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.perf_counter() + self.max_delay
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.perf_counter()
+                try:
+                    item = self._queue.get(timeout=timeout) if timeout > 0 \
+                        else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+            self._process(batch)
+
+    def _process(self, batch):
+        try:
+            results = self.fn(np.stack([row for row, _, _ in batch]))
+        except Exception as exc:
+            for _, future, _ in batch:
+                future.set_exception(exc)
+            return
+        done = time.perf_counter()
+        for i, (_, future, _) in enumerate(batch):
+            future.set_result(results[i])
+        self.stats.record_batch([done - start for _, _, start in batch])
+
+    def close(self):
+        self._queue.put(None)
+        self._worker.join()
+
+
+def _horizon_outputs(model, raw):
+    """``{horizon: prices (N,)}`` from one exported model on raw windows."""
+    pred = model.predict(model.transform(raw), batch_size=len(raw))
+    if isinstance(pred, dict):
+        return {int(name[1:]) if name[1:].isdigit() else name:
+                model.inverse_target(value).reshape(len(raw), -1)[:, 0]
+                for name, value in pred.items()}
+    pred = model.inverse_target(pred).reshape(len(raw), -1)
+    if pred.shape[1] > 1:
+        # seq2seq: one output per step ahead
+        return {step: pred[:, step - 1] for step in range(1, pred.shape[1] + 1)}
+    return {model.meta.get('horizon', 1): pred[:, 0]}
+
+
+class PredictionService:
+    """Exported models behind a :class:`MicroBatcher`.
+
+    ``models`` is a list of :class:`~stock_prediction.inference.NumpyModel`
+    or export paths. All must take the same window shape. When two models
+    produce the same horizon, the later one is used. ``predict``
+    returns ``{horizon: price}`` for one raw window and may be called from
+    many threads at once.
+    """
+
+    def __init__(self, models, max_batch=64, max_delay=0.002):
+        self.models = [NumpyModel.load(m) if isinstance(m, (str, os.PathLike)) else m
+                       for m in models]
+        self.input_shape = self.models[0].input_shape
+        if any(m.input_shape != self.input_shape for m in self.models):
+            raise ValueError("all models must take the same input shape")
+        self.batcher = MicroBatcher(self._predict_batch, max_batch, max_delay)
+
+    def _predict_batch(self, raw):
+        columns = {}
+        for model in self.models:
+            columns.update(_horizon_outputs(model, raw))
+        return [{h: float(v[i]) for h, v in columns.items()} for i in range(len(raw))]
+
+    def submit(self, window):
+        window = np.asarray(window, dtype=np.float64)
+        if window.shape != self.input_shape:
+            raise ValueError(f"expected a window of shape {self.input_shape}, "
+                             f"got {window.shape}")
+        return self.batcher.submit(window)
+
+    def predict(self, window):
+        return self.submit(window).result()
+
+    def predict_many(self, windows):
+        """Forecasts for a ``{ticker: window}`` mapping, batched together."""
+        futures = {ticker: self.submit(window) for ticker, window in windows.items()}
+        return {ticker: future.result() for ticker, future in futures.items()}
+
+    @property
+    def stats(self):
+        return self.batcher.stats
+
+    def close(self):
+        self.batcher.close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    service = None
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._reply(200, {'status': 'ok'})
+        elif self.path == '/stats':
+            self._reply(200, self.service.stats.snapshot())
+        else:
+            self._reply(404, {'error': f'unknown path {self.path}'})
+
+    def do_POST(self):
+        if self.path != '/predict':
+            self._reply(404, {'error': f'unknown path {self.path}'})
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            windows = body['windows'] if 'windows' in body else {'': body['window']}
+            if isinstance(windows, list):
+                windows = dict(enumerate(windows))
+            forecasts = self.service.predict_many(windows)
+        except (KeyError, TypeError, ValueError) as exc:
+            self._reply(400, {'error': str(exc)})
+            return
+        if '' in forecasts:
+            self._reply(200, {'forecast': forecasts['']})
+        else:
+            self._reply(200, {'forecasts': forecasts})
+
+    def address_string(self):
+        # Unix-socket peers have no (host, port) address
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    request_queue_size = 128
+
+
+class _UnixHTTPServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+        super().server_bind()
+
+
+def make_server(service, host='127.0.0.1', port=8765, unix=None):
+    """HTTP server for ``service`` on ``host:port`` or the Unix socket ``unix``."""
+    handler = type('Handler', (_Handler,), {'service': service})
+    if unix:
+        return _UnixHTTPServer(unix, handler)
+    return _HTTPServer((host, port), handler)
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=30):
+        super().__init__('localhost', timeout=timeout)
+        self.unix_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+
+def request(path, body=None, host='127.0.0.1', port=8765, unix=None):
+    """Small client: GET ``path``, or POST ``body`` as JSON. Returns the JSON reply."""
+    conn = _UnixHTTPConnection(unix) if unix else http.client.HTTPConnection(host, port)
+    try:
+        if body is None:
+            conn.request('GET', path)
+        else:
+            conn.request('POST', path, json.dumps(body),
+                         {'Content-Type': 'application/json'})
+        return json.loads(conn.getresponse().read())
+    finally:
+        conn.close()
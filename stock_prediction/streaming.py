@@ -0,0 +1,223 @@
+"""Incremental per-ticker forecasts for a live bar feed.
+
+A windowed forecast feeds the last ``window_size`` bars through the network
+from a zero state, so each new bar recomputes ``window_size - 1`` steps
+that were already done. :class:`StreamingPredictor` keeps each ticker's
+recurrent state (LSTM ``h``/``c``) and advances it by one step per bar,
+together with the incremental feature engine and a ring buffer of the
+last ``window_size`` feature rows::
+
+    stream = StreamingPredictor({1: NumpyModel.load('lstm_h1.npz'),
+                                 5: NumpyModel.load('lstm_h5.npz')})
+    stream.seed('AAPL', history['Adj Close'])
+    for price in feed:
+        forecasts = stream.update('AAPL', price)   # {1: ..., 5: ...}
+
+Equivalence with the windowed path: a carried state has seen every bar
+since the last re-sync, while the windowed ``predict`` only sees the last
+``window_size`` bars. The two agree to float round-off immediately after a
+re-sync, which recomputes the state from the ring buffer (one windowed
+pass), and drift apart slowly after that as older bars fade from the state.
+``resync_every`` bounds that drift (default: once per ``window_size`` bars),
+and :meth:`StreamingPredictor.check` reports the current difference.
+
+Only forward-running recurrent layers can be streamed. The layers after
+the last recurrent encoder (dense heads, a seq2seq decoder) run on its
+state at every bar. Bidirectional models need the whole window and
+raise ``ValueError``.
+"""
+
+import math
+
+import numpy as np
+
+from .features import FeatureEngine
+from .inference import RECURRENT, _apply
+
+
+class RingBuffer:
+    """Fixed number of most recent rows, oldest overwritten first."""
+
+    def __init__(self, size, width):
+        self.data = np.empty((size, width))
+        self.size = size
+        self.count = 0
+        self._next = 0
+
+    def append(self, row):
+        self.data[self._next] = row
+        self._next = (self._next + 1) % self.size
+        self.count += 1
+
+    @property
+    def full(self):
+        return self.count >= self.size
+
+    def window(self):
+        """Buffered rows in arrival order."""
+        if not self.full:
+            return self.data[:self.count].copy()
+        return np.concatenate([self.data[self._next:], self.data[:self._next]])
+
+
+class _Stream:
+    """The streamable prefix of one exported model."""
+
+    def __init__(self, model, horizon=None):
+        self.model = model
+        self.horizon = horizon
+        self.n_streamed = None
+        for i, (layer, _) in enumerate(model.trunk):
+            if layer['type'] in RECURRENT:
+                if layer['go_backwards']:
+                    raise ValueError("backward-running layers cannot be streamed")
+                if not layer['return_sequences']:
+                    self.n_streamed = i + 1
+                    break
+            elif layer['type'] != 'Dense':
+                raise ValueError(f"cannot stream through a {layer['type']} layer")
+        if self.n_streamed is None:
+            raise ValueError("model has no recurrent encoder to stream")
+
+    def advance(self, x, states):
+        """Run (N, T, F) scaled rows through the streamed layers from ``states``.
+
+        Returns the encoder output after the last step and the new states.
+        ``states`` of ``None`` starts from zero, as the windowed path does.
+        """
+        states = list(states or [None] * self.n_streamed)
+        for i, (layer, weights) in enumerate(self.model.trunk[:self.n_streamed]):
+            if layer['type'] in RECURRENT:
+                x, states[i] = RECURRENT[layer['type']](x, layer, weights, states[i])
+            else:
+                x = _apply(x, layer, weights)
+        return x, states
+
+    def forecasts(self, encoded):
+        """``{horizon: price}`` from the encoder output of one ticker."""
+        return self.as_forecasts(self.model._forward(encoded, start=self.n_streamed))
+
+    def as_forecasts(self, out):
+        if isinstance(out, dict):
+            # multi-output heads are named h1, h5, ...
+            return {int(name[1:]) if name[1:].isdigit() else name:
+                    float(self.model.inverse_target(value).ravel()[0])
+                    for name, value in out.items()}
+        values = self.model.inverse_target(out).ravel()
+        if len(values) > 1:
+            # seq2seq: one output per step ahead
+            return {step: float(v) for step, v in enumerate(values, 1)}
+        return {self.horizon or self.model.meta.get('horizon', 1): float(values[0])}
+
+
+class _TickerState:
+    def __init__(self, engine, buffer):
+        self.engine = engine
+        self.buffer = buffer
+        self.states = None
+        self.since_sync = 0
+        self.last = None
+
+
+class StreamingPredictor:
+    """Stateful one-step-per-bar forecasting for any number of tickers.
+
+    ``models`` is one exported :class:`~stock_prediction.inference.NumpyModel`
+    (multi-output or seq2seq) or a ``{horizon: NumpyModel}`` mapping. All
+    models must share the window size and input columns. ``features``
+    defaults to the feature list stored with the first model's export.
+    """
+
+    def __init__(self, models, features=None, resync_every=None, rsi_window=14):
+        if not isinstance(models, dict):
+            models = {None: models}
+        self.streams = [_Stream(model, horizon) for horizon, model in models.items()]
+        first = self.streams[0].model
+        self.window_size, self.width = first.input_shape
+        if any(s.model.input_shape != first.input_shape for s in self.streams):
+            raise ValueError("all models must take the same input shape")
+        columns = features or first.meta.get('features')
+        if columns is None:
+            raise ValueError("features not stored with the model; pass features=")
+        self.columns = list(columns)
+        if len(self.columns) != self.width:
+            raise ValueError(f"{len(self.columns)} feature columns for a model "
+                             f"with {self.width} inputs")
+        self.resync_every = resync_every or self.window_size
+        self.rsi_window = rsi_window
+        self._tickers = {}
+
+    def _ticker(self, ticker):
+        state = self._tickers.get(ticker)
+        if state is None:
+            engine = FeatureEngine(self.columns[1:], self.columns[0], self.rsi_window)
+            state = _TickerState(engine, RingBuffer(self.window_size, self.width))
+            self._tickers[ticker] = state
+        return state
+
+    def _push(self, state, price):
+        row = state.engine.update(price)
+        row = np.array([row[c] for c in self.columns])
+        if np.isnan(row).any():
+            # warm-up bars are dropped, as dropna() does in the batch pipeline
+            return None
+        state.buffer.append(row)
+        return row
+
+    def seed(self, ticker, prices):
+        """Replay historical prices for ``ticker`` and sync its state."""
+        state = self._ticker(ticker)
+        for price in prices:
+            self._push(state, price)
+        if state.buffer.full:
+            self.resync(ticker)
+        return state.last
+
+    def resync(self, ticker):
+        """Recompute ``ticker``'s state from its last ``window_size`` rows.
+
+        Afterwards the streamed forecasts equal the windowed ones.
+        """
+        state = self._tickers[ticker]
+        window = state.buffer.window()
+        state.states, state.last = [], {}
+        for stream in self.streams:
+            x = stream.model.transform(window)[None].astype(stream.model.dtype)
+            encoded, states = stream.advance(x, None)
+            state.states.append(states)
+            state.last.update(stream.forecasts(encoded))
+        state.since_sync = 0
+        return state.last
+
+    def update(self, ticker, price):
+        """Add one bar and return ``{horizon: forecast}`` (None during warm-up)."""
+        state = self._ticker(ticker)
+        row = self._push(state, price)
+        if row is None or not state.buffer.full:
+            return None
+        if state.states is None or state.since_sync + 1 >= self.resync_every:
+            return self.resync(ticker)
+
+        state.last = {}
+        for i, stream in enumerate(self.streams):
+            x = stream.model.transform(row)[None, None].astype(stream.model.dtype)
+            encoded, state.states[i] = stream.advance(x, state.states[i])
+            state.last.update(stream.forecasts(encoded))
+        state.since_sync += 1
+        return state.last
+
+    def check(self, ticker):
+        """Largest price difference between the streamed and windowed forecasts.
+
+        The windowed forecast runs each model's ``predict`` on the ring
+        buffer. The result is ~0 right after a re-sync and shows how far the
+        carried state has drifted since.
+        """
+        state = self._tickers[ticker]
+        if state.last is None:
+            return math.nan
+        windowed = {}
+        for stream in self.streams:
+            X = stream.model.transform(state.buffer.window())[None]
+            windowed.update(stream.as_forecasts(stream.model.predict(X)))
+        return max(abs(state.last[h] - windowed[h]) for h in windowed)
@@ -0,0 +1,179 @@
+"""Shared data preparation and single-model training used by the runners."""
+
+import os
+from collections import namedtuple
+
+import numpy as np
+from sklearn.preprocessing import MinMaxScaler
+
+from .data import cache_key, default_cache_dir, file_digest, load_features
+from .instrument import keras_callback, timed
+from .memory import (DEFAULT_DTYPE, MemoryBudgetError, check_budget, chunk_rows,
+                     windows_nbytes)
+from .windows import MultiHorizonWindows
+
+PreparedData = namedtuple('PreparedData', 'frame scaled scaler windows train_size train_frac')
+
+
+def _scale_to_cache(path, frame, config, dtype):
+    # the scaled matrix as a memmap next to the feature cache, written chunk by
+    # chunk from the (memory-mapped) frame and renamed into place when complete
+    from .outofcore import scale_to_memmap
+
+    cache = os.path.join(default_cache_dir(), 'scaled')
+    os.makedirs(cache, exist_ok=True)
+    target = os.path.join(cache, cache_key(file_digest(path), config) + '.npy')
+    tmp = f'{target}.{os.getpid()}.tmp.npy'
+    try:
+        _, scaler = scale_to_memmap(frame, tmp, dtype=dtype)
+        os.replace(tmp, target)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return np.load(target, mmap_mode='r'), scaler
+
+
+def prepare_data(path, features=(), window_size=60, horizons=(1, 5, 10),
+                 train_frac=0.8, fill='drop', metrics=None, dtype=DEFAULT_DTYPE,
+                 out_of_core=False):
+    """Load, scale and window a price CSV the way ``final_project.py`` does.
+
+    Column 0 of the scaled data is 'Adj Close' and is the target for every
+    horizon. The frame, scaled data, windows and targets are all ``dtype``.
+    With ``out_of_core`` the scaled data is written to the cache directory
+    and memory-mapped instead of being held in memory. The windows are
+    views of that file, and their targets are read from it only for the
+    rows asked for.
+    """
+    frame = load_features(path, features=features, fill=fill, metrics=metrics,
+                          dtype=dtype)
+    with timed(metrics, 'scale', out_of_core=bool(out_of_core)):
+        if out_of_core:
+            config = {'features': list(features), 'fill': fill,
+                      'dtype': np.dtype(dtype).name}
+            scaled, scaler = _scale_to_cache(path, frame, config, dtype)
+        else:
+            scaler = MinMaxScaler()
+            # MinMaxScaler keeps float32 input as float32
+            scaled = scaler.fit_transform(frame).astype(dtype, copy=False)
+    with timed(metrics, 'window'):
+        windows = MultiHorizonWindows(scaled, window_size, horizons, target_col=0,
+                                      lazy_targets=bool(out_of_core))
+    return PreparedData(frame, scaled, scaler, windows, int(len(scaled) * train_frac),
+                        train_frac)
+
+
+def inverse_target(scaler, values, col=0):
+    """Map scaled values of column ``col`` back to prices (the adj_scaler trick)."""
+    return (np.asarray(values) - scaler.min_[col]) / scaler.scale_[col]
+
+
+def predict_in_chunks(net, X, batch_size=None):
+    """``net.predict(X)`` in row chunks whose copy fits the memory budget.
+
+    Keras copies a strided window view into one contiguous tensor, so a
+    single call on a long series can be many times the size of the data.
+    """
+    step = chunk_rows(X)
+    if step >= len(X):
+        return net.predict(X, batch_size=batch_size, verbose=0)
+    return np.concatenate([net.predict(X[i:i + step], batch_size=batch_size, verbose=0)
+                           for i in range(0, len(X), step)])
+
+
+def check_fit_budget(X, y):
+    """Refuse to fit on windows whose in-memory copy exceeds the budget."""
+    check_budget(windows_nbytes(X) + np.asarray(y).nbytes, "training windows")
+
+
+def evaluate_model(prepared, net, horizon, metrics=None, **tags):
+    """Score a trained single-output model on the test windows of ``horizon``.
+
+    Returns ``(mse, y_test, pred)`` with ``y_test`` and ``pred`` in price
+    units.
+    """
+    from sklearn.metrics import mean_squared_error
+
+    _, _, X_test, y_test = prepared.windows.split(horizon, prepared.train_size)
+    with timed(metrics, 'predict', horizon=horizon, n=len(X_test), **tags):
+        pred = predict_in_chunks(net, X_test).reshape(-1, 1)
+    with timed(metrics, 'inverse_transform', horizon=horizon, **tags):
+        pred = inverse_target(prepared.scaler, pred)
+        y_test = inverse_target(prepared.scaler, y_test.reshape(-1, 1))
+    with timed(metrics, 'evaluate', horizon=horizon, **tags):
+        mse = mean_squared_error(y_test, pred)
+    if metrics is not None:
+        metrics.log('result', horizon=horizon, MSE=float(mse), **tags)
+    return mse, y_test, pred
+
+
+def train_model(prepared, horizon, model='LSTM', epochs=30, batch_size=32,
+                validation_split=0.1, patience=5, verbose=0, callbacks=(),
+                init_weights=None, metrics=None, out_of_core=None, tf_data=False,
+                threads=None, **model_params):
+    """Fit one ``model`` architecture for one ``horizon`` and score it.
+
+    ``init_weights`` (from ``model.get_weights()`` of the same architecture)
+    warm-starts training instead of starting from a random initialisation.
+    ``metrics`` records the fit/predict/evaluate stages and every epoch.
+    ``out_of_core=True`` feeds training batches from a
+    :class:`~stock_prediction.outofcore.WindowSequence` instead of one
+    materialised window array. The default (``None``) does so only when
+    that array would exceed the memory budget, or when ``prepared`` comes
+    from ``prepare_data(..., out_of_core=True)``. The windows and targets of
+    each batch are then cut from ``prepared.scaled``, which for the latter
+    is a file on disk rather than memory. ``tf_data=True`` instead
+    trains through :func:`~stock_prediction.pipeline.fit_pipeline` (with a
+    private input pool of ``threads`` threads), which gathers each batch's
+    windows as needed, or caches them once when a memory budget is set and
+    they fit it.
+    Returns ``(model, history, mse, y_test, pred)`` with ``y_test`` and
+    ``pred`` in price units.
+    """
+    from tensorflow.keras.callbacks import EarlyStopping
+
+    from .models import BUILDERS
+
+    windows = prepared.windows
+    X_train = windows.X[:windows.n_train(horizon, prepared.train_size)]
+    # targets are gathered here only for an in-memory fit
+    y_train = None
+    if out_of_core is None and not tf_data:
+        out_of_core = windows.lazy_targets
+        if not out_of_core:
+            y_train = windows.split(horizon, prepared.train_size)[1]
+            try:
+                check_fit_budget(X_train, y_train)
+            except MemoryBudgetError:
+                out_of_core = True
+    net = BUILDERS[model](windows.window_size, X_train.shape[-1], **model_params)
+    if init_weights is not None:
+        net.set_weights(init_weights)
+    early_stop = EarlyStopping(monitor='val_loss', patience=patience,
+                               restore_best_weights=True)
+    callbacks = [early_stop, *callbacks]
+    tags = {'model': model}
+    if metrics is not None:
+        n_fit = len(X_train) - int(len(X_train) * validation_split)
+        callbacks.append(keras_callback(metrics, n_fit, horizon=horizon, **tags))
+    with timed(metrics, 'fit', horizon=horizon, n=len(X_train), **tags):
+        if tf_data:
+            from .pipeline import fit_pipeline
+
+            history = fit_pipeline(net, prepared.scaled, windows.window_size, horizon,
+                                   len(X_train), batch_size, validation_split,
+                                   threads=threads, epochs=epochs, verbose=verbose,
+                                   callbacks=callbacks)
+        elif out_of_core:
+            from .outofcore import fit_out_of_core
+
+            history = fit_out_of_core(net, prepared.scaled, windows.window_size, horizon,
+                                      len(X_train), batch_size, validation_split,
+                                      epochs=epochs, verbose=verbose, callbacks=callbacks)
+        else:
+            if y_train is None:
+                y_train = windows.split(horizon, prepared.train_size)[1]
+            history = net.fit(X_train, y_train, epochs=epochs, batch_size=batch_size,
+                              validation_split=validation_split, verbose=verbose,
+                              callbacks=callbacks)
+    return (net, history, *evaluate_model(prepared, net, horizon, metrics, **tags))
@@ -0,0 +1,119 @@
+"""Hyperparameter search with successive halving.
+
+Trials are sampled from a space over units, dropout, window size, batch size
+and learning rate. All live trials train for a small epoch budget, in
+parallel on the :mod:`~stock_prediction.scheduler` process pool. Only the
+best ``1/eta`` by validation loss continue to the next rung, which has
+``eta`` times the budget. Clearly bad settings are dropped after a few
+epochs. Between rungs each trial's full model (weights and optimizer state)
+is saved, so survivors resume where they stopped.
+"""
+
+import os
+import random
+import tempfile
+from functools import partial
+
+import pandas as pd
+
+from .scheduler import get_prepared, run_jobs
+
+DEFAULT_SPACE = {
+    'units': [32, 50, 64, 100],
+    'dropout_rate': [0.1, 0.2, 0.3],
+    'window_size': [30, 60, 90],
+    'batch_size': [16, 32, 64],
+    'learning_rate': [3e-4, 1e-3, 3e-3],
+}
+
+
+def sample_trials(space=None, n_trials=27, seed=0):
+    """``n_trials`` distinct random settings from ``space`` (dict of lists)."""
+    space = space or DEFAULT_SPACE
+    rng = random.Random(seed)
+    names = sorted(space)
+    n_total = 1
+    for name in names:
+        n_total *= len(space[name])
+
+    seen, trials = set(), []
+    while len(trials) < min(n_trials, n_total):
+        params = {name: rng.choice(space[name]) for name in names}
+        key = tuple(params[name] for name in names)
+        if key not in seen:
+            seen.add(key)
+            trials.append(params)
+    return trials
+
+
+def rung_step(job, data_path, workdir, horizon, model, features=(),
+              validation_split=0.1):
+    """Train one trial up to ``job['epochs']`` and report its validation loss."""
+    from tensorflow.keras.models import load_model
+
+    from .models import BUILDERS
+    from .training import check_fit_budget
+
+    params = dict(job['params'])
+    window_size = params.pop('window_size', 60)
+    batch_size = params.pop('batch_size', 32)
+    prepared = get_prepared(data_path, features, window_size, (horizon,))
+    X_train, y_train, _, _ = prepared.windows.split(horizon, prepared.train_size)
+    check_fit_budget(X_train, y_train)
+
+    path = os.path.join(workdir, f"trial_{job['trial']}.keras")
+    if job['initial_epoch'] and os.path.exists(path):
+        net = load_model(path)
+    else:
+        net = BUILDERS[model](window_size, X_train.shape[-1], **params)
+    history = net.fit(X_train, y_train, epochs=job['epochs'],
+                      initial_epoch=job['initial_epoch'], batch_size=batch_size,
+                      validation_split=validation_split, verbose=0)
+    net.save(path)
+    return {'val_loss': float(min(history.history['val_loss'])),
+            'loss': float(history.history['loss'][-1])}
+
+
+def successive_halving(data_path, horizon=1, model='LSTM', space=None,
+                       n_trials=27, min_epochs=3, max_epochs=27, eta=3,
+                       features=(), max_workers=None, tf_threads=1,
+                       workdir=None, results_csv=None, seed=0):
+    """Search ``space`` and return the trials ranked by validation loss.
+
+    Rung budgets are ``min_epochs, min_epochs * eta, ...`` up to
+    ``max_epochs``. The returned DataFrame has one row per trial with its
+    parameters, the last rung and epoch it reached, and its best
+    validation loss. Trials that reached later rungs rank first. It is also
+    written to ``results_csv`` when given.
+    """
+    workdir = workdir or tempfile.mkdtemp(prefix='tuning-')
+    os.makedirs(workdir, exist_ok=True)
+    fn = partial(rung_step, data_path=data_path, workdir=workdir, horizon=horizon,
+                 model=model, features=features)
+
+    trials = {i: {'trial': i, **params}
+              for i, params in enumerate(sample_trials(space, n_trials, seed))}
+    alive = list(trials)
+    epochs, previous, rung = min_epochs, 0, 0
+    while alive:
+        jobs = [{'trial': i, 'rung': rung, 'initial_epoch': previous, 'epochs': epochs,
+                 'params': {k: v for k, v in trials[i].items() if k != 'trial'}}
+                for i in alive]
+        for entry in run_jobs(jobs, fn, max_workers, tf_threads):
+            trial = trials[entry['job']['trial']]
+            trial.update(rung=rung, epochs=epochs, status=entry['status'],
+                         val_loss=entry.get('val_loss', float('inf')))
+
+        finished = [i for i in alive if trials[i]['status'] == 'ok']
+        finished.sort(key=lambda i: trials[i]['val_loss'])
+        if epochs >= max_epochs or len(finished) <= 1:
+            break
+        alive = finished[:max(1, len(finished) // eta)]
+        previous, epochs, rung = epochs, min(epochs * eta, max_epochs), rung + 1
+
+    table = pd.DataFrame(trials.values())
+    table = table.sort_values(['rung', 'val_loss'], ascending=[False, True])
+    table.index = pd.RangeIndex(1, len(table) + 1, name='rank')
+    if results_csv:
+        table.to_csv(results_csv)
+    return table
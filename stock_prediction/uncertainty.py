@@ -0,0 +1,92 @@
+"""Monte Carlo dropout forecasts with prediction intervals.
+
+The builders' ``Dropout`` layers stay active at inference, and the spread
+of many stochastic forward passes gives a predictive distribution. Instead
+of ``n_samples`` separate ``predict`` calls, each window is tiled
+``n_samples`` times into one large batch. Dropout draws an independent
+mask for every row, so one call through a traced ``tf.function`` yields
+all the passes, at roughly the cost of one batched prediction over
+``N * n_samples`` rows::
+
+    fc = mc_forecast(net, X_test, n_samples=200,
+                     inverse_transform=lambda v: inverse_target(scaler, v))
+    fc.mean, fc.quantiles[0.05], fc.quantiles[0.95]
+
+Multi-output models return one forecast per horizon. A model without
+dropout returns zero-width bands.
+"""
+
+import weakref
+from collections import namedtuple
+
+import numpy as np
+
+from .memory import DEFAULT_DTYPE
+
+MCForecast = namedtuple('MCForecast', 'mean std quantiles samples')
+
+_STOCHASTIC_FNS = weakref.WeakKeyDictionary()
+
+
+def _stochastic_fn(net, input_shape):
+    import tensorflow as tf
+
+    key = tuple(input_shape)
+    fns = _STOCHASTIC_FNS.setdefault(net, {})
+    if key not in fns:
+        spec = tf.TensorSpec((None, *input_shape), tf.float32)
+        fns[key] = tf.function(lambda x: net(x, training=True), input_signature=[spec])
+    return fns[key]
+
+
+def mc_dropout_samples(net, X, n_samples=100, batch_size=8192):
+    """Outputs of ``n_samples`` dropout-active passes, shape ``(n_samples, N, ...)``.
+
+    ``X`` is tiled in chunks of windows so that at most about ``batch_size``
+    rows go through the network per call. Multi-output models return a
+    dict of such arrays.
+    """
+    X = np.asarray(X, dtype=DEFAULT_DTYPE)
+    fn = _stochastic_fn(net, X.shape[1:])
+    per_call = max(1, batch_size // n_samples)
+    parts = []
+    for start in range(0, len(X), per_call):
+        chunk = X[start:start + per_call]
+        # (n_samples * k, ...) with the k windows repeated n_samples times
+        tiled = np.broadcast_to(chunk, (n_samples, *chunk.shape)).reshape(-1, *X.shape[1:])
+        out = fn(tiled)
+        if isinstance(out, dict):
+            parts.append({k: np.asarray(v).reshape(n_samples, len(chunk), -1)
+                          for k, v in out.items()})
+        else:
+            parts.append(np.asarray(out).reshape(n_samples, len(chunk), *out.shape[1:]))
+    if isinstance(parts[0], dict):
+        return {k: np.concatenate([p[k] for p in parts], axis=1) for k in parts[0]}
+    return np.concatenate(parts, axis=1)
+
+
+def summarize(samples, quantiles=(0.05, 0.5, 0.95), keep_samples=False):
+    """:class:`MCForecast` from an ``(n_samples, N, ...)`` array of draws."""
+    bands = np.quantile(samples, quantiles, axis=0)
+    return MCForecast(samples.mean(axis=0), samples.std(axis=0),
+                      dict(zip(quantiles, bands)), samples if keep_samples else None)
+
+
+def mc_forecast(net, X, n_samples=100, quantiles=(0.05, 0.5, 0.95),
+                inverse_transform=None, batch_size=8192, keep_samples=False):
+    """Mean, standard deviation and quantile bands of MC-dropout forecasts.
+
+    ``inverse_transform`` (e.g. mapping scaled values back to prices) is
+    applied to every draw before the statistics are taken. Returns an
+    :class:`MCForecast`, or ``{horizon: MCForecast}`` for a multi-output
+    model with heads named ``h1``, ``h5``, ...
+    """
+    samples = mc_dropout_samples(net, X, n_samples, batch_size)
+    if inverse_transform is None:
+        def inverse_transform(v):
+            return v
+    if isinstance(samples, dict):
+        return {int(name[1:]) if name[1:].isdigit() else name:
+                summarize(inverse_transform(s), quantiles, keep_samples)
+                for name, s in samples.items()}
+    return summarize(inverse_transform(samples), quantiles, keep_samples)
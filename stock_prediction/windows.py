@@ -0,0 +1,182 @@
+"""Sliding-window sample builders for the RNN/LSTM models.
+
+The windows are returned as read-only strided views over the scaled series,
+so building X costs no memory beyond the source array. Pass
+``materialize=True`` only when a contiguous copy is really needed.
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .memory import check_budget, windows_nbytes
+
+
+def make_windows(data, window_size, horizon=1, output_length=None,
+                 target_col=None, materialize=False):
+    """Build (X, y) samples from a scaled series.
+
+    ``data`` is a 1-D series or a 2-D (time, features) array. Sample ``i``
+    uses ``data[i:i + window_size]`` as input and the row
+    ``i + window_size + horizon - 1`` as target, which matches the
+    ``create_sequences`` helpers in ``final_project.py``.
+
+    With ``output_length`` set, the target is the block of ``output_length``
+    consecutive rows starting at that row (the seq2seq shape) and y keeps a
+    step axis: ``(N, output_length[, F])``. ``target_col`` selects a single
+    column of the target rows, e.g. ``0`` for 'Adj Close'.
+
+    ``materialize=True`` raises
+    :class:`~stock_prediction.memory.MemoryBudgetError` when the copy would
+    exceed the memory budget.
+    """
+    data = np.asarray(data)
+    if data.ndim not in (1, 2):
+        raise ValueError(f"data must be 1-D or 2-D, got shape {data.shape}")
+    if window_size < 1 or horizon < 1:
+        raise ValueError("window_size and horizon must be >= 1")
+
+    steps = 1 if output_length is None else output_length
+    if steps < 1:
+        raise ValueError("output_length must be >= 1")
+
+    n_samples = len(data) - window_size - horizon - steps + 2
+    if n_samples < 1:
+        raise ValueError(
+            f"series of length {len(data)} is too short for window_size="
+            f"{window_size}, horizon={horizon}, output_length={steps}")
+
+    # (N, window) for 1-D data, (N, window, F) for 2-D data
+    X = sliding_window_view(data, window_size, axis=0)[:n_samples]
+    if data.ndim == 2:
+        X = X.transpose(0, 2, 1)
+
+    start = np.arange(n_samples) + window_size + horizon - 1
+    if output_length is not None:
+        start = start[:, None] + np.arange(steps)
+
+    if target_col is None or data.ndim == 1:
+        y = data[start]
+    else:
+        y = data[start, target_col]
+
+    if materialize:
+        check_budget(windows_nbytes(X), "materialised windows")
+        X = np.ascontiguousarray(X)
+    return X, y
+
+
+class LazyTargets:
+    """Array-like ``(N, len(horizons))`` targets read from the series when indexed.
+
+    ``Y[rows, cols]`` gathers only the requested rows, so a memory-mapped
+    series is never copied whole. Targets past the end are NaN, as in
+    :class:`MultiHorizonWindows`.
+    """
+
+    def __init__(self, target, window_size, horizons, n_samples):
+        self.target = target
+        self.window_size = window_size
+        self.horizons = np.asarray(horizons)
+        self.shape = (n_samples, len(horizons))
+        self.dtype = np.result_type(target.dtype, np.float32)
+        self.ndim = 2
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, key):
+        rows, cols = key if isinstance(key, tuple) else (key, slice(None))
+        if isinstance(rows, slice):
+            rows = np.arange(*rows.indices(self.shape[0]))
+        else:
+            rows = np.asarray(rows)
+            rows = np.where(rows < 0, rows + self.shape[0], rows)
+        horizons = self.horizons[cols]
+        if np.ndim(horizons):
+            rows = rows[..., None]
+        offsets = rows + self.window_size - 1 + horizons
+        out = np.full(offsets.shape, np.nan, dtype=self.dtype)
+        valid = offsets < len(self.target)
+        out[valid] = self.target[offsets[valid]]
+        return out
+
+
+class MultiHorizonWindows:
+    """Input windows built once and shared across several forecast horizons.
+
+    ``X`` holds one window per start position and ``Y`` holds the target for
+    every horizon side by side, shape ``(N, len(horizons))``. Targets that
+    fall past the end of the series are NaN; use :meth:`rows` or
+    :meth:`split` to get only the rows that are valid for one horizon.
+    With ``lazy_targets`` ``Y`` is a :class:`LazyTargets` that reads the
+    series on indexing instead of an array, for series that should stay on
+    disk.
+    """
+
+    def __init__(self, data, window_size, horizons=(1, 5, 10), target_col=0,
+                 materialize=False, lazy_targets=False):
+        data = np.asarray(data)
+        self.horizons = tuple(sorted(set(int(h) for h in horizons)))
+        if not self.horizons or self.horizons[0] < 1:
+            raise ValueError("horizons must be positive integers")
+        self.window_size = window_size
+        self.length = len(data)
+
+        self.X, _ = make_windows(data, window_size, self.horizons[0],
+                                 target_col=target_col, materialize=materialize)
+        target = data[:, target_col] if data.ndim == 2 else data
+
+        n_samples = len(self.X)
+        self.lazy_targets = lazy_targets
+        if lazy_targets:
+            self.Y = LazyTargets(target, window_size, self.horizons, n_samples)
+            return
+        offsets = np.arange(n_samples)[:, None] + window_size - 1 + np.array(self.horizons)
+        valid = offsets < self.length
+        self.Y = np.full((n_samples, len(self.horizons)), np.nan,
+                         dtype=np.result_type(target.dtype, np.float32))
+        self.Y[valid] = target[offsets[valid]]
+
+    def __len__(self):
+        return len(self.X)
+
+    def _column(self, horizon):
+        try:
+            return self.horizons.index(horizon)
+        except ValueError:
+            raise KeyError(f"horizon {horizon} not in {self.horizons}") from None
+
+    def n_valid(self, horizon):
+        """Number of leading rows whose ``horizon`` target exists."""
+        self._column(horizon)
+        return self.length - self.window_size - horizon + 1
+
+    def n_train(self, horizon, train_size):
+        """Number of training samples (target before ``train_size``) at ``horizon``."""
+        self._column(horizon)
+        return max(train_size - self.window_size - horizon + 1, 0)
+
+    def rows(self, horizon, steps=False):
+        """Return ``(X, y)`` for the rows valid at ``horizon``.
+
+        With ``steps=True`` y holds the targets of every stored horizon up
+        to and including ``horizon``, shape ``(n, k)``.
+        """
+        col = self._column(horizon)
+        n = self.n_valid(horizon)
+        if steps:
+            return self.X[:n], self.Y[:n, :col + 1]
+        return self.X[:n], self.Y[:n, col]
+
+    def split(self, horizon, train_size):
+        """Chronological train/test split at row ``train_size`` of the series.
+
+        Matches windowing ``data[:train_size]`` and
+        ``data[train_size - window_size:]`` separately: training samples
+        have their target before ``train_size`` and test samples start at
+        ``train_size - window_size``.
+        """
+        X, y = self.rows(horizon)
+        n_train = self.n_train(horizon, train_size)
+        test_start = train_size - self.window_size
+        return X[:n_train], y[:n_train], X[test_start:], y[test_start:]
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+from stock_prediction.features import add_features, panel_features
+
+FEATURES = ['MA10', 'MA50', 'Returns', 'RSI']
+
+
+def halted_panel(n=400, n_tickers=3):
+    rng = np.random.default_rng(0)
+    prices = np.exp(np.cumsum(rng.normal(0, 0.02, (n, n_tickers)), axis=0)) * 50
+    prices[150:190, 0] = prices[149, 0]          # trading halt: 40 flat bars
+    prices[300:320, 1] = prices[299, 1]
+    prices[60:63, 1] = np.nan                    # gaps
+    prices[:30, 2] = np.nan                      # listed late
+    prices[370:, 2] = np.nan                     # delisted
+    return pd.DataFrame(prices, index=pd.bdate_range('2015-01-01', periods=n),
+                        columns=['HALT', 'GAPS', 'LATE'])
+
+
+def test_panel_matches_per_ticker_features_through_halts_and_gaps():
+    panel = halted_panel()
+    out = panel_features(panel, FEATURES)
+
+    for ticker in panel.columns:
+        expected = add_features(panel[[ticker]].rename(columns={ticker: 'Adj Close'}),
+                                FEATURES)
+        for name in FEATURES:
+            np.testing.assert_allclose(out[name][ticker].to_numpy(np.float64),
+                                       expected[name].to_numpy(), rtol=1e-9, atol=1e-9,
+                                       equal_nan=True, err_msg=f"{ticker} {name}")
+
+
+def test_rsi_is_undefined_on_a_flat_stretch():
+    rsi = panel_features(halted_panel(), ['RSI'])['RSI']['HALT']
+    # a window of 14 deltas that are all zero: no gain, no loss
+    assert rsi.iloc[164:190].isna().all()
+    assert ((rsi.dropna() >= 0) & (rsi.dropna() <= 100)).all()
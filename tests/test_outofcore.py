@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from stock_prediction.outofcore import WindowSequence
+from stock_prediction.training import prepare_data
+from stock_prediction.windows import LazyTargets, make_windows
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv('STOCK_PREDICTION_CACHE', str(tmp_path / 'cache'))
+
+
+@pytest.mark.parametrize('block_size', [None, 100, 96])
+def test_batches_stay_inside_one_block(block_size):
+    rng = np.random.default_rng(0)
+    data = rng.normal(size=(2000, 3)).astype(np.float32)
+    seq = WindowSequence(data, 20, horizon=5, target_col=0, batch_size=32,
+                         block_size=block_size, seed=1)
+    X_all, y_all = make_windows(data, 20, 5, target_col=0)
+
+    for _ in range(2):
+        seen = []
+        for i in range(len(seq)):
+            batch = seq._batches[i]
+            # no batch reads more than one block of samples
+            assert batch.max() - batch.min() < seq.block_size
+            assert batch.min() // seq.block_size == batch.max() // seq.block_size
+            X, y = seq[i]
+            np.testing.assert_array_equal(X, X_all[batch])
+            np.testing.assert_array_equal(y, y_all[batch])
+            seen.append(batch)
+        assert sorted(np.concatenate(seen)) == list(range(len(X_all)))
+        seq.on_epoch_end()
+
+
+def test_out_of_core_prepare_keeps_targets_on_disk(tmp_path):
+    rng = np.random.default_rng(0)
+    path = tmp_path / 'prices.csv'
+    pd.DataFrame({'Date': pd.bdate_range('2015-01-01', periods=500),
+                  'Adj Close': np.exp(np.cumsum(rng.normal(0, 0.02, 500))) * 50}
+                 ).to_csv(path, index=False)
+    memory = prepare_data(str(path), ['MA10'], window_size=20, horizons=(1, 5))
+    disk = prepare_data(str(path), ['MA10'], window_size=20, horizons=(1, 5),
+                        out_of_core=True)
+
+    assert isinstance(disk.scaled, np.memmap)
+    assert isinstance(disk.windows.Y, LazyTargets)
+    for horizon in (1, 5):
+        for a, b in zip(memory.windows.split(horizon, memory.train_size),
+                        disk.windows.split(horizon, disk.train_size)):
+            np.testing.assert_allclose(a, b, rtol=1e-6)
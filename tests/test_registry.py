@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from stock_prediction.instrument import RunMetrics
+from stock_prediction.registry import ModelRegistry
+from stock_prediction.training import prepare_data
+
+FIT = {'model': 'SimpleRNN', 'epochs': 1, 'batch_size': 64, 'units': 4}
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv('STOCK_PREDICTION_CACHE', str(tmp_path / 'cache'))
+
+
+def write_prices(path, n):
+    rng = np.random.default_rng(0)
+    prices = np.exp(np.cumsum(rng.normal(0, 0.02, 751))) * 50
+    pd.DataFrame({'Date': pd.bdate_range('2015-01-01', periods=751),
+                  'Adj Close': prices})[:n].to_csv(path, index=False)
+    return str(path)
+
+
+def test_longer_frame_warm_starts(tmp_path):
+    registry = ModelRegistry(str(tmp_path / 'models'))
+    short = prepare_data(write_prices(tmp_path / 'short.csv', 699), window_size=20,
+                         horizons=(1,))
+    full = prepare_data(write_prices(tmp_path / 'full.csv', 751), window_size=20,
+                        horizons=(1,))
+
+    assert registry.fetch_or_train(short, 1, **FIT)[2] == 'trained'
+    assert registry.fetch_or_train(full, 1, **FIT)[2] == 'warm'
+
+
+def test_input_plumbing_does_not_change_the_key(tmp_path):
+    registry = ModelRegistry(str(tmp_path / 'models'))
+    prepared = prepare_data(write_prices(tmp_path / 'full.csv', 751), window_size=20,
+                            horizons=(1,))
+
+    assert registry.fetch_or_train(prepared, 1, **FIT)[2] == 'trained'
+    status = registry.fetch_or_train(prepared, 1, metrics=RunMetrics(), tf_data=True,
+                                     verbose=0, **FIT)[2]
+    assert status == 'cached'